@@ -0,0 +1,38 @@
+"""Память на одну тренировку: объекты против `TrainingBatch`.
+
+Запуск: python benchmarks/bench_memory.py [число тренировок]
+"""
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+
+def measure(name, count, build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name}: {size / count:.1f} байт на тренировку')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows = [[25 + i % 25, 1.5, 80.5 + i % 7, 25.0, 40.0]
+            for i in range(count)]
+
+    measure('объекты Swimming', count,
+            lambda: [homework.Swimming(*data) for data in rows])
+    measure('TrainingBatch', count,
+            lambda: homework.TrainingBatch('SWM', rows))
+    measure('InfoMessage', count,
+            lambda: [homework.InfoMessage('Swimming', *data[1:])
+                     for data in rows])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Масштабирование `process_parallel` от 1 до N процессов.
+
+Запуск: python benchmarks/bench_parallel.py [число пакетов] [размер куска]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    packages = list(homework.generate_packages(count))
+
+    start = time.perf_counter()
+    for workout_type, data in packages:
+        homework.read_package(workout_type, data).show_training_info()
+    serial = time.perf_counter() - start
+    print(f'без пула: {serial:.3f} с, {count / serial:,.0f} пакетов/с')
+
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        for _ in homework.process_parallel(packages, workers, chunk_size):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f'процессов: {workers}: {elapsed:.3f} с, '
+              f'{count / elapsed:,.0f} пакетов/с, '
+              f'ускорение x{serial / elapsed:.2f}')
+
+        start = time.perf_counter()
+        results = homework.process_parallel_shared(packages, workers,
+                                                   chunk_size)
+        elapsed = time.perf_counter() - start
+        results.unlink()
+        print(f'  общая память: {elapsed:.3f} с, '
+              f'{count / elapsed:,.0f} пакетов/с')
+
+
+if __name__ == '__main__':
+    main()
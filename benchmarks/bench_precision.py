@@ -0,0 +1,38 @@
+"""Скорость и память `calculate_batch` в режимах точности.
+
+Запуск: python benchmarks/bench_precision.py [число пакетов]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    columns = [list(column) for column in zip(*[
+        data for _, data in homework.generate_packages(count,
+                                                       mix={'WLK': 1})
+    ])]
+    reference = homework.calculate_batch('WLK', columns)
+    for precision in homework.PRECISIONS:
+        tracemalloc.start()
+        start = time.perf_counter()
+        metrics = homework.calculate_batch('WLK', columns, precision)
+        elapsed = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        error = max(abs(float(value) - expected) / expected
+                    for value, expected in zip(metrics.calories,
+                                               reference.calories))
+        print(f'{precision}: {count / elapsed:,.0f} пакетов/с, '
+              f'{size / count:.1f} байт на пакет, '
+              f'отн. погрешность калорий {error:.1e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Скорость вывода сообщений: словарь полей + `str.format` против шаблона.
+
+Запуск: python benchmarks/bench_render.py [число сообщений]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+
+def measure(name, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f'{name}: {elapsed:.3f} с, {count / elapsed:,.0f} сообщений/с')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    messages = [homework.InfoMessage('Running', 1 + i % 7, 9.75, 9.75,
+                                     797.805 + i)
+                for i in range(count)]
+
+    def old():
+        for info in messages:
+            info.MESSAGE.format(**{name: getattr(info, name)
+                                   for name in info.__slots__})
+
+    def new():
+        for info in messages:
+            info.get_message()
+
+    measure('dict + format', count, old)
+    measure('get_message', count, new)
+    measure('render_many', count, lambda: homework.render_many(messages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Нагрузочный тест: генерация пакетов и устойчивая пропускная способность.
+
+Запуск:
+    python benchmarks/load_test.py --count 2000000 --invalid-rate 0.01
+    python benchmarks/load_test.py --format binary --mix SWM=1,RUN=3,WLK=2
+
+Сначала пишет файл уникальных пакетов и показывает скорость генерации
+и записи (`--repeat` повторяет первый блок — быстрее, но данные
+повторяются каждые `--block` пакетов), затем
+прогоняет его через `read_packages`, `show_training_info` и `main`
+с выводом в /dev/null. Пропускная способность считается по окнам
+в одну секунду, память — по пиковому RSS процесса.
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from itertools import compress
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+
+def parse_mix(text):
+    if not text:
+        return None
+    return {code: float(weight) for code, weight
+            in (item.split('=') for item in text.split(','))}
+
+
+def read_packages(path, file_format):
+    if file_format == 'binary':
+        return homework.iter_binary_file(path)
+    return homework.stream_packages(homework.read_lines([path]))
+
+
+def drive(path, file_format, chunk_size):
+    """Прогнать файл через конвейер, вернуть окна по секунде."""
+    windows = []
+    total = rejected = 0
+    started = window_start = time.perf_counter()
+    window_count = 0
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        with homework.BufferedSink(devnull) as sink:
+            for chunk in homework._chunks(read_packages(path, file_format),
+                                          chunk_size):
+                trainings, errors = homework.read_packages(chunk)
+                homework.main_many(trainings, sink)
+                total += len(chunk)
+                rejected += len(list(compress(errors, errors)))
+                window_count += len(chunk)
+                now = time.perf_counter()
+                if now - window_start >= 1:
+                    windows.append(window_count / (now - window_start))
+                    window_start, window_count = now, 0
+    elapsed = time.perf_counter() - started
+    return total, rejected, elapsed, windows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=('text', 'binary'),
+                        default='text')
+    parser.add_argument('--mix', help='доли типов, например SWM=1,RUN=2')
+    parser.add_argument('--invalid-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--block', type=int, default=65536)
+    parser.add_argument('--repeat', action='store_true',
+                        help='повторять первый блок вместо новых')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--path', help='файл пакетов, по умолчанию '
+                                       'временный')
+    args = parser.parse_args()
+
+    directory = None if args.path else tempfile.mkdtemp()
+    path = args.path or os.path.join(directory, 'packages')
+    try:
+        run(args, path)
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory)
+
+
+def run(args, path):
+    start = time.perf_counter()
+    written = homework.write_packages(
+        path, args.count, args.format, args.block, args.repeat,
+        seed=args.seed, mix=parse_mix(args.mix),
+        invalid_rate=args.invalid_rate
+    )
+    elapsed = time.perf_counter() - start
+    print(f'генерация и запись: {written / elapsed / 1e6:.1f} МБ/с, '
+          f'{args.count / elapsed:,.0f} пакетов/с, '
+          f'{written / 1e6:.1f} МБ за {elapsed:.2f} с')
+
+    total, rejected, elapsed, windows = drive(path, args.format,
+                                              args.chunk_size)
+    print(f'пакетов: {total}, отклонено: {rejected}, '
+          f'среднее: {total / elapsed:,.0f} пакетов/с')
+    if windows:
+        print(f'по секундам: мин {min(windows):,.0f}, '
+              f'макс {max(windows):,.0f} пакетов/с')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'пик памяти (RSS): {peak / 1024:.1f} МБ')
+
+
+if __name__ == '__main__':
+    main()
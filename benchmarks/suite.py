@@ -0,0 +1,124 @@
+"""Замеры горячих путей `homework.py` с проверкой регрессий.
+
+Запуск:
+    python benchmarks/suite.py --save        # записать базовые замеры
+    python benchmarks/suite.py               # сравнить с базовыми
+    python benchmarks/suite.py --threshold 0.1 --count 20000
+
+Время каждого случая — лучшее из нескольких повторов, в микросекундах
+на пакет. Если случай медленнее базового больше чем на threshold,
+скрипт завершается с кодом 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+MIXES = {
+    'mixed': None,
+    'swm': {'SWM': 1},
+    'run': {'RUN': 1},
+    'wlk': {'WLK': 1},
+}
+
+
+def _trainings(packages):
+    return [homework.read_package(*package) for package in packages]
+
+
+def _main(trainings):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for training in trainings:
+            homework.main(training)
+
+
+def cases(count, seed=0):
+    """Получить замеры: имя -> (подготовка, замеряемая функция)."""
+    packages = {name: list(homework.generate_packages(count, mix, seed))
+                for name, mix in MIXES.items()}
+    result = {
+        'read_package': (
+            lambda: packages['mixed'],
+            lambda items: [homework.read_package(*item) for item in items]
+        ),
+        'show_training_info': (
+            lambda: _trainings(packages['mixed']),
+            lambda items: [item.show_training_info() for item in items]
+        ),
+        'get_message': (
+            lambda: [item.show_training_info()
+                     for item in _trainings(packages['mixed'])],
+            lambda items: [item.get_message() for item in items]
+        ),
+        'main': (lambda: _trainings(packages['mixed']), _main),
+    }
+    for name in ('swm', 'run', 'wlk'):
+        result[f'get_spent_calories_{name}'] = (
+            lambda name=name: _trainings(packages[name]),
+            lambda items: [item.get_spent_calories() for item in items]
+        )
+        result[f'show_training_info_{name}'] = (
+            lambda name=name: packages[name],
+            lambda items: [homework.read_package(*item).show_training_info()
+                           for item in items]
+        )
+    return result
+
+
+def run(count=10000, repeat=5, seed=0):
+    """Замерить все случаи, время в микросекундах на пакет."""
+    timings = {}
+    for name, (setup, func) in cases(count, seed).items():
+        best = float('inf')
+        for _ in range(repeat):
+            items = setup()
+            start = time.perf_counter()
+            func(items)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best / count * 1e6
+    return timings
+
+
+def compare(timings, baseline, threshold):
+    """Получить регрессии: имя -> (базовое время, новое время)."""
+    return {name: (baseline[name], value)
+            for name, value in timings.items()
+            if name in baseline and value > baseline[name] * (1 + threshold)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save', action='store_true')
+    args = parser.parse_args()
+
+    timings = run(args.count, args.repeat)
+    for name, value in timings.items():
+        print(f'{name:28} {value:8.3f} мкс/пакет')
+    if args.save:
+        args.baseline.write_text(json.dumps(timings, indent=2) + '\n')
+        print(f'Базовые замеры записаны в {args.baseline}')
+        return 0
+    if not args.baseline.exists():
+        print('Нет базовых замеров, запустите с --save')
+        return 0
+    regressions = compare(timings, json.loads(args.baseline.read_text()),
+                          args.threshold)
+    for name, (old, new) in regressions.items():
+        print(f'РЕГРЕССИЯ {name}: {old:.3f} -> {new:.3f} мкс/пакет')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,56 @@
-from dataclasses import dataclass, asdict
-from typing import Type, Dict
+from __future__ import annotations
+
+import io
+import os
+import struct
+import sys
+import time
+from _string import formatter_parser
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from functools import partial, wraps
+from itertools import chain, compress, islice
+from operator import attrgetter
+
+CHUNK_SIZE = 1 << 16
+
+
+def _chunks(items: Iterable, chunk_size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def compile_message(message: str) -> tuple[str, Callable]:
+    """Перевести шаблон `str.format` с именами полей в %-шаблон.
+
+    Возвращает %-шаблон и функцию, достающую поля объекта в нужном
+    порядке. Спецификации формата вида `.3f` у обоих способов совпадают.
+    Шаблон разбирается тем же `formatter_parser`, что и в
+    `string.Formatter.parse`, без импорта `string` и `re` при старте.
+    """
+    template = []
+    names = []
+    for literal, name, spec, _ in formatter_parser(message):
+        template.append(literal.replace('%', '%%'))
+        if name is not None:
+            template.append(f'%{spec}' if spec else '%s')
+            names.append(name)
+    return ''.join(template), attrgetter(*names)
+
+
+TEMPLATE_TYPES = frozenset((str, int, float))
 
 
-@dataclass
 class InfoMessage:
     """Информационное сообщение о тренировке."""
-    training_type: str
-    duration: float
-    distance: float
-    speed: float
-    calories: float
+    __slots__ = ('training_type', 'duration', 'distance', 'speed',
+                 'calories')
 
     MESSAGE = (
         'Тип тренировки: {training_type}; '
@@ -18,16 +59,147 @@ class InfoMessage:
         'Ср. скорость: {speed:.3f} км/ч; '
         'Потрачено ккал: {calories:.3f}.'
     )
+    TEMPLATE, TEMPLATE_VALUES = compile_message(MESSAGE)
+
+    def __init__(self,
+                 training_type: str,
+                 duration: float,
+                 distance: float,
+                 speed: float,
+                 calories: float) -> None:
+        self.training_type = training_type
+        self.duration = duration
+        self.distance = distance
+        self.speed = speed
+        self.calories = calories
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}'
+                           for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        values = attrgetter(*self.__slots__)
+        return values(self) == values(other)
+
+    __hash__ = None
 
     def get_message(self) -> str:
-        return self.MESSAGE.format(**asdict(self))
+        """Получить текст сообщения.
+
+        %-шаблон переводит числа во float, поэтому значения других типов
+        (например, `Decimal`) форматируются через `MESSAGE.format`.
+        """
+        values = self.TEMPLATE_VALUES(self)
+        if TEMPLATE_TYPES.issuperset(map(type, values)):
+            return self.TEMPLATE % values
+        return self.MESSAGE.format(**{name: getattr(self, name)
+                                      for name in self.__slots__})
+
+
+def render_many(messages: Iterable[InfoMessage],
+                output: io.IOBase | None = None,
+                chunk_size: int = 10000) -> io.IOBase:
+    """Записать сообщения построчно в один буфер.
+
+    Текст пишется в `io.StringIO` (по умолчанию) или любой текстовый
+    поток, в бинарные потоки пишутся байты UTF-8.
+    """
+    output = io.StringIO() if output is None else output
+    binary = isinstance(output, (io.BufferedIOBase, io.RawIOBase))
+    for chunk in _chunks(messages, chunk_size):
+        values = [info.TEMPLATE_VALUES(info) for info in chunk]
+        if TEMPLATE_TYPES.issuperset(map(type, chain.from_iterable(values))):
+            lines = [info.TEMPLATE % value
+                     for info, value in zip(chunk, values)]
+        else:
+            lines = [info.get_message() for info in chunk]
+        text = '\n'.join(lines) + '\n'
+        output.write(text.encode() if binary else text)
+    return output
+
+
+class BufferedSink:
+    """Буфер строк вывода с явной политикой сброса.
+
+    Строки копятся в памяти и пишутся в output одним вызовом, когда
+    набралось max_lines строк, max_chars символов или с прошлого
+    сброса прошло max_delay секунд. Без output пишет в текущий
+    `sys.stdout`. В конце работы нужен `flush` или блок `with`.
+    """
+
+    def __init__(self, output: io.TextIOBase | None = None,
+                 max_lines: int = 10000, max_chars: int = CHUNK_SIZE,
+                 max_delay: float | None = None) -> None:
+        self.output = output
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.lines: list[str] = []
+        self.chars = 0
+        self.flushed = time.monotonic()
+
+    def write_line(self, line: str) -> None:
+        """Добавить строку и сбросить буфер, если он заполнен."""
+        self.lines.append(line)
+        self.chars += len(line) + 1
+        if (len(self.lines) >= self.max_lines
+                or self.chars >= self.max_chars
+                or self.max_delay is not None
+                and time.monotonic() - self.flushed >= self.max_delay):
+            self.flush()
+
+    def flush(self) -> None:
+        """Записать накопленные строки и сбросить поток."""
+        output = self.output or sys.stdout
+        if self.lines:
+            output.write('\n'.join(self.lines) + '\n')
+            self.lines.clear()
+            self.chars = 0
+        output.flush()
+        self.flushed = time.monotonic()
+
+    def __enter__(self) -> 'BufferedSink':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+
+def cached_metric(method: Callable) -> Callable:
+    """Запомнить результат метода, пока не изменились данные тренировки."""
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self):
+        fields = self.FIELD_VALUES(self)
+        cache = self.__dict__.get('_metrics')
+        if cache is None or cache[0] != fields:
+            cache = self._metrics = (fields, {})
+        metrics = cache[1]
+        if name not in metrics:
+            metrics[name] = method(self)
+        return metrics[name]
+    return wrapper
 
 
 class Training:
-    """Базовый класс тренировки."""
+    """Базовый класс тренировки.
+
+    Дистанция, скорость и калории считаются один раз и запоминаются
+    вместе со значениями полей из `FIELDS`; если поле изменилось,
+    показатели пересчитываются. `get_*` считают одно число по полям
+    объекта, а `*_kernel` — те же формулы для целых столбцов (их
+    совпадение проверяют тесты). По умолчанию `get_spent_calories`
+    вызывает `calories_kernel`.
+    """
     LEN_STEP = 0.65
     M_IN_KM = 1000
     MIN_IN_H = 60
+    FIELDS = ('action', 'duration', 'weight')
+    FIELD_VALUES = attrgetter(*FIELDS)
 
     def __init__(self,
                  action: int,
@@ -38,17 +210,44 @@ class Training:
         self.duration = duration
         self.weight = weight
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_VALUES = attrgetter(*cls.FIELDS)
+
+    @classmethod
+    def distance_kernel(cls, action, duration, weight, *args):
+        """Формула дистанции в км для чисел или столбцов."""
+        return action * cls.LEN_STEP / cls.M_IN_KM
+
+    @classmethod
+    def speed_kernel(cls, distance, action, duration, weight, *args):
+        """Формула средней скорости для чисел или столбцов."""
+        return distance / duration
+
+    @classmethod
+    def calories_kernel(cls, speed, action, duration, weight, *args):
+        """Формула затраченных калорий для чисел или столбцов."""
+        pass
+
+    def get_data(self) -> list[float]:
+        """Получить данные пакета, из которых создана тренировка."""
+        return list(self.FIELD_VALUES(self))
+
+    @cached_metric
     def get_distance(self) -> float:
         """Получить дистанцию в км."""
         return self.action * self.LEN_STEP / self.M_IN_KM
 
+    @cached_metric
     def get_mean_speed(self) -> float:
         """Получить среднюю скорость движения."""
         return self.get_distance() / self.duration
 
+    @cached_metric
     def get_spent_calories(self) -> float:
         """Получить количество затраченных калорий."""
-        pass
+        return self.calories_kernel(self.get_mean_speed(),
+                                    *self.FIELD_VALUES(self))
 
     def show_training_info(self) -> InfoMessage:
         """Вернуть информационное сообщение о выполненной тренировке."""
@@ -65,7 +264,17 @@ class Running(Training):
     CALORIES_MEAN_SPEED_MULTIPLIER = 18
     CALORIES_MEAN_SPEED_SHIFT = 1.79
 
-    def get_spent_calories(self):
+    @classmethod
+    def calories_kernel(cls, speed, action, duration, weight, *args):
+        return ((cls.CALORIES_MEAN_SPEED_MULTIPLIER
+                * speed
+                + cls.CALORIES_MEAN_SPEED_SHIFT)
+                * weight
+                / cls.M_IN_KM
+                * (duration * cls.MIN_IN_H))
+
+    @cached_metric
+    def get_spent_calories(self) -> float:
         return ((self.CALORIES_MEAN_SPEED_MULTIPLIER
                 * self.get_mean_speed()
                 + self.CALORIES_MEAN_SPEED_SHIFT)
@@ -79,6 +288,7 @@ class SportsWalking(Training):
     CALORIES_WEIGHT_MULTIPLIER = 0.035
     CALORIES_SPEED_HEIGHT_MULTIPLIER = 0.029
     CM_IN_M = 100
+    FIELDS = Training.FIELDS + ('height',)
     KMH_IN_MSEC = round(Training.M_IN_KM
                         / (Training.MIN_IN_H * Training.MIN_IN_H), 3)
 
@@ -90,6 +300,15 @@ class SportsWalking(Training):
         super().__init__(action, duration, weight)
         self.height = height
 
+    @classmethod
+    def calories_kernel(cls, speed, action, duration, weight, height):
+        return ((cls.CALORIES_WEIGHT_MULTIPLIER * weight
+                + ((speed * round(cls.KMH_IN_MSEC, 3))**2
+                   / (height / cls.CM_IN_M))
+                * cls.CALORIES_SPEED_HEIGHT_MULTIPLIER
+                * weight) * duration * cls.MIN_IN_H)
+
+    @cached_metric
     def get_spent_calories(self) -> float:
         return ((self.CALORIES_WEIGHT_MULTIPLIER * self.weight
                 + ((self.get_mean_speed() * round(self.KMH_IN_MSEC, 3))**2
@@ -103,6 +322,7 @@ class Swimming(Training):
     LEN_STEP = 1.38
     СALORIES_SPEED_MULTIPLIER = 1.1
     COEFF_COUNT_СALORIES = 2
+    FIELDS = Training.FIELDS + ('length_pool', 'count_pool')
 
     def __init__(self,
                  action: int,
@@ -114,51 +334,2312 @@ class Swimming(Training):
         self.length_pool = length_pool
         self.count_pool = count_pool
 
+    @classmethod
+    def speed_kernel(cls, distance, action, duration, weight,
+                     length_pool, count_pool):
+        return (length_pool * count_pool
+                / cls.M_IN_KM / duration)
+
+    @classmethod
+    def calories_kernel(cls, speed, action, duration, weight, *args):
+        return ((speed + cls.СALORIES_SPEED_MULTIPLIER)
+                * cls.COEFF_COUNT_СALORIES * weight * duration)
+
+    @cached_metric
     def get_mean_speed(self) -> float:
         return (self.length_pool * self.count_pool
                 / self.M_IN_KM / self.duration)
 
+    @cached_metric
     def get_spent_calories(self) -> float:
         return ((self.get_mean_speed() + self.СALORIES_SPEED_MULTIPLIER)
                 * self.COEFF_COUNT_СALORIES * self.weight * self.duration)
 
 
-TRAININGS: Dict[str, Type[Training]] = {
+class TrainingRegistry(dict):
+    """Реестр тренировок: код -> (класс тренировки, число данных).
+
+    Плагины объявляют классы в группе entry points `homework.trainings`
+    (имя — код тренировки). Модуль плагина импортируется только при
+    первом обращении к его коду. Для пакетного расчёта класс плагина
+    переопределяет `calories_kernel` так же, как встроенные классы.
+    """
+    ENTRY_POINT_GROUP = 'homework.trainings'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._entry_points: dict[str, object] | None = None
+
+    def register(self, code: str, training_class: type[Training],
+                 arity: int | None = None,
+                 wire_code: int | None = None) -> None:
+        """Зарегистрировать класс тренировки под кодом."""
+        global _VALIDATOR
+        if arity is None:
+            arity = len(training_class.FIELDS)
+        self[code] = (training_class, arity)
+        if wire_code is not None:
+            WIRE_CODES[code] = wire_code
+            WIRE_TYPES[wire_code] = code
+        _VALIDATOR = None
+
+    def unregister(self, code: str) -> None:
+        """Убрать тренировку из реестра."""
+        global _VALIDATOR
+        dict.pop(self, code, None)
+        WIRE_TYPES.pop(WIRE_CODES.pop(code, None), None)
+        _VALIDATOR = None
+
+    def _plugins(self) -> dict[str, object]:
+        if self._entry_points is None:
+            from importlib.metadata import entry_points
+
+            self._entry_points = {
+                entry_point.name: entry_point for entry_point
+                in entry_points(group=self.ENTRY_POINT_GROUP)
+            }
+        return self._entry_points
+
+    def _load(self, code: str) -> bool:
+        entry_point = self._plugins().pop(code, None)
+        if entry_point is None:
+            return False
+        training_class = entry_point.load()
+        if not dict.__contains__(self, code):
+            self.register(code, training_class)
+        return True
+
+    def load_all(self) -> None:
+        """Импортировать все плагины, например перед перебором реестра."""
+        for code in list(self._plugins()):
+            self._load(code)
+
+    def __missing__(self, code: str) -> tuple[type[Training], int]:
+        if self._load(code):
+            return dict.__getitem__(self, code)
+        raise KeyError(code)
+
+    def __contains__(self, code: object) -> bool:
+        return dict.__contains__(self, code) or (
+            isinstance(code, str) and self._load(code)
+        )
+
+    def get(self, code: str, default=None):
+        try:
+            return self[code]
+        except KeyError:
+            return default
+
+
+TRAININGS: TrainingRegistry = TrainingRegistry({
     'SWM': (Swimming, 5),
     'RUN': (Running, 3),
     'WLK': (SportsWalking, 4)
-}
+})
+
+
+def register_training(code: str, arity: int | None = None,
+                      wire_code: int | None = None) -> Callable:
+    """Декоратор, регистрирующий класс тренировки в `TRAININGS`."""
+    def decorator(training_class: type[Training]) -> type[Training]:
+        TRAININGS.register(code, training_class, arity, wire_code)
+        return training_class
+    return decorator
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными границами."""
+    BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 1e-3, 1e-2)
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Instrumentation:
+    """Счётчики и таймеры стадий обработки пакетов.
+
+    Включается через `enable_instrumentation`; пока она выключена,
+    `read_package` и `main` делают только одну проверку на None.
+    Доля profile_rate вызовов `main` профилируется через cProfile,
+    дампы pstats пишутся в profile_dir.
+    """
+
+    def __init__(self, profile_rate: float = 0.0,
+                 profile_dir: str = '.', seed: int | None = None):
+        import random
+
+        self.packages: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        self.stages: dict[str, Histogram] = {}
+        self.profile_rate = profile_rate
+        self.profile_dir = profile_dir
+        self.profiles = 0
+        self._random = random.Random(seed)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Учесть длительность стадии."""
+        if stage not in self.stages:
+            self.stages[stage] = Histogram()
+        self.stages[stage].observe(seconds)
+
+    def read_package(self, workout_type: str, data) -> Training:
+        started = time.perf_counter()
+        try:
+            training = _read_package(workout_type, data)
+        except ValueError:
+            reason = 'arity' if workout_type in TRAININGS else 'workout_type'
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+            raise
+        self.observe('read_package', time.perf_counter() - started)
+        self.packages[workout_type] = self.packages.get(workout_type, 0) + 1
+        return training
+
+    def main(self, training: Training,
+             sink: BufferedSink | None = None) -> None:
+        profiler = None
+        if self.profile_rate and self._random.random() < self.profile_rate:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        info = training.show_training_info()
+        rendered = time.perf_counter()
+        message = info.get_message()
+        finished = time.perf_counter()
+        if sink is None:
+            print(message)
+        else:
+            sink.write_line(message)
+        if profiler is not None:
+            profiler.disable()
+            self.profiles += 1
+            profiler.dump_stats(os.path.join(
+                self.profile_dir, f'package-{self.profiles}.pstats'
+            ))
+        self.observe('show_training_info', rendered - started)
+        self.observe('render', finished - rendered)
+
+    def to_prometheus(self) -> str:
+        """Получить метрики в текстовом формате Prometheus."""
+        lines = ['# TYPE homework_packages_total counter']
+        lines += [f'homework_packages_total{{workout_type="{key}"}} {value}'
+                  for key, value in self.packages.items()]
+        lines.append('# TYPE homework_validation_failures_total counter')
+        lines += [f'homework_validation_failures_total{{reason="{key}"}} '
+                  f'{value}' for key, value in self.failures.items()]
+        lines.append('# TYPE homework_stage_seconds histogram')
+        for stage, histogram in self.stages.items():
+            cumulative = 0
+            for bound, count in zip((*Histogram.BOUNDS, '+Inf'),
+                                    histogram.buckets):
+                cumulative += count
+                lines.append(f'homework_stage_seconds_bucket{{stage='
+                             f'"{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'homework_stage_seconds_sum{{stage="{stage}"}} '
+                         f'{histogram.total}')
+            lines.append(f'homework_stage_seconds_count{{stage="{stage}"}} '
+                         f'{histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str) -> None:
+        """Записать метрики Prometheus в файл."""
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+
+
+_INSTRUMENTATION: Instrumentation | None = None
+
+
+def enable_instrumentation(profile_rate: float = 0.0,
+                           profile_dir: str = '.',
+                           seed: int | None = None) -> Instrumentation:
+    """Включить сбор метрик и вернуть объект с ними."""
+    global _INSTRUMENTATION
+    _INSTRUMENTATION = Instrumentation(profile_rate, profile_dir, seed)
+    return _INSTRUMENTATION
+
+
+def disable_instrumentation() -> None:
+    """Выключить сбор метрик."""
+    global _INSTRUMENTATION
+    _INSTRUMENTATION = None
 
 
 def read_package(workout_type: str, data) -> Training:
     """Прочитать данные полученные от датчиков."""
+    if _INSTRUMENTATION is not None:
+        return _INSTRUMENTATION.read_package(workout_type, data)
+    return _read_package(workout_type, data)
 
-    if workout_type not in TRAININGS:
+
+def _read_package(workout_type: str, data) -> Training:
+    training_class, arity = TRAININGS.get(workout_type, (None, None))
+    if training_class is None:
         raise ValueError(f"Неправильный тип тренировки\n"
                          f"Возможные названия тренировок: {workout_type}")
 
-    if TRAININGS[workout_type][1] != len(data):
+    if arity != len(data):
         raise ValueError(f'Неправильный тип данных: '
-                         f'{TRAININGS[workout_type][1]}.'
+                         f'{arity}.'
                          'Такая тренировка не поддерживается'
                          f'У вас некорректные данные: {len(data)}.'
                          'Чиловые данные могут быть от 3 до 5')
 
-    return TRAININGS[workout_type][0](*data)
+    return training_class(*data)
+
+
+VALID, UNKNOWN_TYPE, WRONG_ARITY, WRONG_TYPE, OUT_OF_RANGE = range(5)
+ERRORS = {
+    UNKNOWN_TYPE: 'Неизвестный тип тренировки',
+    WRONG_ARITY: 'Неправильное количество данных',
+    WRONG_TYPE: 'Данные должны быть числами',
+    OUT_OF_RANGE: 'Данные вне допустимого диапазона',
+}
+POSITIVE_FIELDS = frozenset(('duration', 'weight', 'height', 'length_pool'))
+
+
+def _check_value(value, positive: bool) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return WRONG_TYPE
+    if positive:
+        return VALID if 0 < value < float('inf') else OUT_OF_RANGE
+    return VALID if 0 <= value < float('inf') else OUT_OF_RANGE
+
+
+class PackageValidator:
+    """Проверка пакетов без исключений, собранная из `TRAININGS`.
+
+    Для каждого пакета возвращается код ошибки (`VALID`, `UNKNOWN_TYPE`,
+    `WRONG_ARITY`, `WRONG_TYPE`, `OUT_OF_RANGE`). Поля из
+    `POSITIVE_FIELDS` должны быть больше нуля, остальные — не меньше.
+    """
+
+    def __init__(self,
+                 trainings: dict[str, tuple] | None = None) -> None:
+        self.trainings = TRAININGS if trainings is None else trainings
+        self.rules = {workout_type: self._make_rule(*entry)
+                      for workout_type, entry in self.trainings.items()}
+
+    @staticmethod
+    def _make_rule(training_class: type[Training],
+                   arity: int) -> tuple[int, list[bool]]:
+        return arity, [field in POSITIVE_FIELDS
+                       for field in training_class.FIELDS]
+
+    def rule(self, workout_type: str) -> tuple[int | None, list]:
+        """Получить число данных и признаки положительных полей."""
+        rule = self.rules.get(workout_type)
+        if rule is None:
+            if workout_type not in self.trainings:
+                return None, []
+            rule = self.rules[workout_type] = self._make_rule(
+                *self.trainings[workout_type]
+            )
+        return rule
+
+    def check(self, workout_type: str, data: Sequence) -> int:
+        """Получить код ошибки одного пакета."""
+        arity, positive = self.rule(workout_type)
+        if arity is None:
+            return UNKNOWN_TYPE
+        if len(data) != arity:
+            return WRONG_ARITY
+        for value, flag in zip(data, positive):
+            error = _check_value(value, flag)
+            if error:
+                return error
+        return VALID
+
+    def validate(self, packages: Iterable[tuple[str, Sequence]]
+                 ) -> tuple[bytearray, bytearray]:
+        """Получить маску корректных пакетов и коды ошибок по строкам."""
+        errors = bytearray(self.check(workout_type, data)
+                           for workout_type, data in packages)
+        return bytearray(not error for error in errors), errors
+
+    def validate_columns(self, workout_type: str,
+                         columns: Sequence[Sequence]
+                         ) -> tuple[bytearray, bytearray]:
+        """Проверить столбцы одного типа тренировки целиком."""
+        size = len(columns[0]) if columns else 0
+        arity, positive = self.rule(workout_type)
+        if arity is None:
+            errors = bytearray([UNKNOWN_TYPE]) * size
+        elif len(columns) != arity:
+            errors = bytearray([WRONG_ARITY]) * size
+        else:
+            errors = bytearray(size)
+            for column, flag in zip(columns, positive):
+                for index, error in enumerate(map(_check_value, column,
+                                                  [flag] * size)):
+                    if error and not errors[index]:
+                        errors[index] = error
+        return bytearray(not error for error in errors), errors
+
+
+_VALIDATOR: PackageValidator | None = None
+
+
+def get_validator() -> PackageValidator:
+    """Получить проверку пакетов для текущего `TRAININGS`."""
+    global _VALIDATOR
+    if _VALIDATOR is None:
+        _VALIDATOR = PackageValidator()
+    return _VALIDATOR
 
 
-def main(training: Training) -> None:
-    """Главная функция."""
+def read_packages(packages: Iterable[tuple[str, Sequence]]
+                  ) -> tuple[list[Training], bytearray]:
+    """Прочитать пачку пакетов, пропуская некорректные.
+
+    Возвращает тренировки по корректным пакетам и коды ошибок по всем
+    строкам; один плохой пакет не прерывает обработку пачки.
+    """
+    packages = list(packages)
+    mask, errors = get_validator().validate(packages)
+    trainings = [TRAININGS[workout_type][0](*data)
+                 for workout_type, data in compress(packages, mask)]
+    return trainings, errors
+
+
+PRECISIONS = ('float64', 'float32', 'decimal')
+_PRECISION_CLASSES: dict[tuple[type, str], type[Training]] = {}
+
+
+def _to_float32(value: float) -> float:
+    return array('f', (value,))[0]
+
+
+def _to_decimal(value):
+    from decimal import Decimal
+
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def precision_class(training_class: type[Training],
+                    precision: str) -> type[Training]:
+    """Получить вариант класса тренировки для режима точности.
+
+    `float64` — обычные числа Python. `float32` — после каждой формулы
+    результат округляется до float32, относительная погрешность
+    показателей не больше 1e-6 от float64. `decimal` — константы
+    класса и данные переводятся в `Decimal` по их десятичной записи,
+    результат детерминирован и отличается от float64 не больше чем
+    на 1e-12 относительно.
+    """
+    if precision == 'float64':
+        return training_class
+    if precision not in PRECISIONS:
+        raise ValueError(f'Неизвестный режим точности: {precision}')
+    key = (training_class, precision)
+    if key not in _PRECISION_CLASSES:
+        if precision == 'decimal':
+            namespace = {
+                name: _to_decimal(getattr(training_class, name))
+                for name in dir(training_class)
+                if name.isupper() and isinstance(
+                    getattr(training_class, name), (int, float)
+                )
+            }
+        else:
+            namespace = {
+                name: classmethod(
+                    lambda cls, *args, kernel=getattr(training_class, name):
+                    _to_float32(kernel(*args))
+                )
+                for name in ('distance_kernel', 'speed_kernel',
+                             'calories_kernel')
+            }
+            namespace.update({
+                name: (lambda self, *args,
+                       method=getattr(training_class, name):
+                       _to_float32(method(self, *args)))
+                for name in ('get_distance', 'get_mean_speed',
+                             'get_spent_calories')
+            })
+        _PRECISION_CLASSES[key] = type(training_class.__name__,
+                                       (training_class,), namespace)
+    return _PRECISION_CLASSES[key]
+
+
+def convert_training(training: Training, precision: str) -> Training:
+    """Пересоздать тренировку в другом режиме точности."""
+    convert = {'float64': float, 'float32': _to_float32,
+               'decimal': _to_decimal}[precision]
+    training_class = precision_class(type(training), precision)
+    return training_class(*map(convert, training.get_data()))
+
+
+class BatchMetrics:
+    """Столбцы дистанции, скорости и калорий для пачки тренировок."""
+
+    def __init__(self, distance: array, speed: array,
+                 calories: array) -> None:
+        self.distance = distance
+        self.speed = speed
+        self.calories = calories
+
+
+def _numpy_columns(training_class: type[Training],
+                   columns: Sequence[Sequence[float]]
+                   ) -> BatchMetrics | None:
+    """Посчитать float64-столбцы тремя вызовами ядер на массивах NumPy.
+
+    Возвращает None, если NumPy не установлен или ядра плагина не
+    умеют работать с массивами. Деление на ноль поднимает
+    `FloatingPointError` (подкласс `ArithmeticError`), как и в
+    поштучном расчёте.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    values = [numpy.asarray(column, dtype=numpy.float64)
+              for column in columns]
+    try:
+        with numpy.errstate(divide='raise', invalid='raise'):
+            distance = training_class.distance_kernel(*values)
+            speed = training_class.speed_kernel(distance, *values)
+            calories = training_class.calories_kernel(speed, *values)
+    except (TypeError, ValueError):
+        return None
+    size = len(values[0])
+    results = []
+    for result in (distance, speed, calories):
+        column = array('d', [0.0]) * size
+        numpy.frombuffer(column)[:] = result
+        results.append(column)
+    return BatchMetrics(*results)
+
+
+def calculate_batch(workout_type: str,
+                    columns: Sequence[Sequence[float]],
+                    precision: str = 'float64') -> BatchMetrics:
+    """Посчитать показатели для столбцов данных одного типа тренировки.
+
+    Столбцы идут в порядке `FIELDS` класса тренировки. Формулы те же,
+    что и у объектов, поэтому результаты совпадают с `show_training_info`.
+    В режиме float64 при установленном NumPy ядра `*_kernel` вызываются
+    по одному разу на целые столбцы. Без NumPy, в других режимах и для
+    ядер, не работающих с массивами, ядро вызывается через `map` для
+    каждой строки — это не векторизованный расчёт, он лишь экономит
+    создание объектов тренировок.
+    При precision='float32' данные и результаты хранятся в `array('f')`,
+    при 'decimal' — в списках `Decimal` (см. `precision_class`).
+    """
+    if workout_type not in TRAININGS:
+        raise ValueError(f'Неизвестный тип тренировки: {workout_type}')
+    training_class, arity = TRAININGS[workout_type]
+    if len(columns) != arity:
+        raise ValueError(f'Ожидалось столбцов: {arity}, '
+                         f'получено: {len(columns)}')
+    if precision == 'float64':
+        metrics = _numpy_columns(training_class, columns)
+        if metrics is not None:
+            return metrics
+        store = partial(array, 'd')
+    elif precision == 'float32':
+        store = partial(array, 'f')
+        columns = [store(column) for column in columns]
+    else:
+        training_class = precision_class(training_class, precision)
+        store = list
+        columns = [list(map(_to_decimal, column)) for column in columns]
+    distance = store(map(training_class.distance_kernel, *columns))
+    speed = store(map(training_class.speed_kernel, distance, *columns))
+    calories = store(map(training_class.calories_kernel, speed, *columns))
+    return BatchMetrics(distance, speed, calories)
+
+
+def calculate_batches(
+        batches: dict[str, Sequence[Sequence[float]]]
+) -> dict[str, BatchMetrics]:
+    """Посчитать показатели для столбцов, сгруппированных по типу."""
+    return {workout_type: calculate_batch(workout_type, columns)
+            for workout_type, columns in batches.items()}
+
+
+class TrainingBatch:
+    """Тренировки одного типа, хранящиеся типизированными столбцами.
+
+    Вместо объекта на каждую тренировку хранится по массиву `array('d')`
+    на поле; объект тренировки создаётся только при обращении к строке.
+    """
+
+    def __init__(self, workout_type: str,
+                 rows: Iterable[Sequence[float]] = ()) -> None:
+        if workout_type not in TRAININGS:
+            raise ValueError(f'Неизвестный тип тренировки: {workout_type}')
+        self.workout_type = workout_type
+        self.training_class, self.arity = TRAININGS[workout_type]
+        self.columns = [array('d') for _ in range(self.arity)]
+        self.extend(rows)
+
+    def append(self, data: Sequence[float]) -> None:
+        """Добавить данные одного пакета."""
+        if len(data) != self.arity:
+            raise ValueError(f'Ожидалось значений: {self.arity}, '
+                             f'получено: {len(data)}')
+        for column, value in zip(self.columns, data):
+            column.append(value)
+
+    def extend(self, rows: Iterable[Sequence[float]]) -> None:
+        """Добавить данные нескольких пакетов."""
+        for data in rows:
+            self.append(data)
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, index: int) -> Training:
+        return self.training_class(*[column[index]
+                                     for column in self.columns])
+
+    def __iter__(self) -> Iterator[Training]:
+        for data in zip(*self.columns):
+            yield self.training_class(*data)
+
+    def metrics(self) -> BatchMetrics:
+        """Посчитать показатели всех тренировок пачки."""
+        return calculate_batch(self.workout_type, self.columns)
+
+
+def main(training: Training, sink: BufferedSink | None = None) -> None:
+    """Главная функция.
+
+    Без sink сообщение печатается сразу, иначе копится в буфере sink.
+    """
+    if _INSTRUMENTATION is not None:
+        return _INSTRUMENTATION.main(training, sink)
     info = training.show_training_info()
-    print(info.get_message())
+    if sink is None:
+        print(info.get_message())
+    else:
+        sink.write_line(info.get_message())
 
 
-if __name__ == '__main__':
-    packages = [
-        ('SWM', [720, 1, 80, 25, 40]),
-        ('RUN', [15000, 1, 75]),
-        ('WLR', [9000, 1, 75, 180]),
-    ]
+def main_many(trainings: Iterable[Training],
+              sink: BufferedSink | None = None) -> None:
+    """Вывести сообщения о тренировках за один проход через буфер."""
+    if sink is None:
+        with BufferedSink() as sink:
+            return main_many(trainings, sink)
+    for training in trainings:
+        main(training, sink)
+
+
+def parse_package(line: str) -> tuple[str, list[float]]:
+    """Разобрать строку пакета вида `SWM 720 1 80 25 40`."""
+    workout_type, *values = line.split()
+    return workout_type, [float(value) for value in values]
+
+
+def read_lines(paths: Sequence[str] = (),
+               chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Читать строки из файлов или stdin (`-`) кусками по chunk_size."""
+    for path in paths or ['-']:
+        if path == '-':
+            yield from _read_chunks(sys.stdin, chunk_size)
+            continue
+        with open(path, encoding='utf-8', buffering=chunk_size) as stream:
+            yield from _read_chunks(stream, chunk_size)
+
+
+def _read_chunks(stream: io.TextIOBase, chunk_size: int) -> Iterator[str]:
+    while True:
+        lines = stream.readlines(chunk_size)
+        if not lines:
+            return
+        yield from lines
+
+
+def _parse_value(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def stream_packages(lines: Iterable[str]) -> Iterator[tuple[str, list[float]]]:
+    """Разобрать непустые строки, пропуская комментарии `#`.
+
+    Значения, которые не читаются как числа, остаются строками, чтобы
+    такой пакет отбросила проверка `filter_packages`, а не исключение.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            package = parse_package(line)
+        except ValueError:
+            workout_type, *values = line.split()
+            package = workout_type, [_parse_value(value)
+                                     for value in values]
+        yield package
 
+
+def filter_packages(packages: Iterable[tuple[str, Sequence]],
+                    rejected: dict[int, int] | None = None
+                    ) -> Iterator[tuple[str, Sequence]]:
+    """Пропустить только корректные пакеты, без исключений.
+
+    Число отброшенных пакетов по кодам ошибок (`ERRORS`) добавляется
+    в rejected.
+    """
+    check = get_validator().check
     for workout_type, data in packages:
-        main(read_package(workout_type, data))
+        error = check(workout_type, data)
+        if not error:
+            yield workout_type, data
+        elif rejected is not None:
+            rejected[error] = rejected.get(error, 0) + 1
+
+
+def report_rejected(rejected: dict[int, int],
+                    errors: io.TextIOBase | None = None) -> None:
+    """Напечатать число отброшенных пакетов по причинам в stderr."""
+    for error, count in sorted(rejected.items()):
+        print(f'Пропущено пакетов: {count} ({ERRORS[error]})',
+              file=errors or sys.stderr)
+
+
+def stream_messages(
+        packages: Iterable[tuple[str, Sequence[float]]],
+        rejected: dict[int, int] | None = None
+) -> Iterator[str]:
+    """Превратить поток пакетов в поток строк сообщений.
+
+    Некорректные пакеты пропускаются и учитываются в rejected.
+    """
+    for workout_type, data in filter_packages(packages, rejected):
+        training = read_package(workout_type, data)
+        yield training.show_training_info().get_message()
+
+
+def run_stream(paths: Sequence[str] = (),
+               output: io.TextIOBase | None = None,
+               chunk_size: int = CHUNK_SIZE,
+               errors: io.TextIOBase | None = None,
+               rejected: dict[int, int] | None = None) -> int:
+    """Обработать пакеты из файлов или stdin с постоянной памятью.
+
+    Строки читаются и пишутся кусками не больше chunk_size символов,
+    следующий кусок читается только после записи предыдущего.
+    Некорректные строки пропускаются и учитываются в rejected, их число
+    по причинам печатается в errors (по умолчанию stderr). Возвращает
+    число сообщений.
+    """
+    count = 0
+    rejected = {} if rejected is None else rejected
+    with BufferedSink(output, max_lines=chunk_size,
+                      max_chars=chunk_size) as sink:
+        for message in stream_messages(stream_packages(
+                read_lines(paths, chunk_size)), rejected):
+            sink.write_line(message)
+            count += 1
+    report_rejected(rejected, errors)
+    return count
+
+
+def _process_chunk(chunk: list[tuple[str, Sequence[float]]]) -> list[tuple]:
+    """Посчитать кусок пакетов в рабочем процессе.
+
+    Назад отправляются кортежи полей `InfoMessage`, а не объекты.
+    """
+    result = []
+    for workout_type, data in chunk:
+        info = read_package(workout_type, data).show_training_info()
+        result.append((info.training_type, info.duration, info.distance,
+                       info.speed, info.calories))
+    return result
+
+
+def process_parallel(packages: Iterable[tuple[str, Sequence[float]]],
+                     workers: int | None = None,
+                     chunk_size: int = 1000,
+                     ordered: bool = True) -> Iterator[InfoMessage]:
+    """Обработать пакеты в пуле процессов, раздавая их кусками.
+
+    В работе одновременно не больше двух кусков на процесс, поэтому
+    поток пакетов не вычитывается в память целиком. При ordered=False
+    сообщения отдаются по мере готовности кусков.
+    """
+    from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                    wait)
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(packages, chunk_size)
+    with ProcessPoolExecutor(workers) as executor:
+        pending = [executor.submit(_process_chunk, chunk)
+                   for chunk in islice(chunks, workers * 2)]
+        while pending:
+            if ordered:
+                done = [pending.pop(0)]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                pending = [future for future in pending
+                           if future not in finished]
+            for future in done:
+                for fields in future.result():
+                    yield InfoMessage(*fields)
+                pending.extend(executor.submit(_process_chunk, chunk)
+                               for chunk in islice(chunks, 1))
+
+
+SAMPLE_DISTRIBUTIONS: dict[str, tuple] = {
+    'action': ('normal', 9000, 3500, 100, 40000),
+    'duration': ('normal', 1, 0.4, 0.1, 4),
+    'weight': ('normal', 75, 12, 40, 150),
+    'height': ('normal', 175, 9, 140, 210),
+    'length_pool': ('choice', (25, 50)),
+    'count_pool': ('normal', 40, 15, 1, 120),
+}
+INVALID_KINDS = ('workout_type', 'arity', 'range')
+
+
+def _sample(rnd, distribution: tuple) -> float:
+    kind, *args = distribution
+    if kind == 'uniform':
+        return rnd.uniform(*args)
+    if kind == 'choice':
+        return rnd.choice(args[0])
+    mean, sigma, low, high = args
+    return min(high, max(low, rnd.gauss(mean, sigma)))
+
+
+def generate_packages(count: int,
+                      mix: dict[str, float] | None = None,
+                      seed: int = 0,
+                      distributions: dict[str, tuple] | None = None,
+                      invalid_rate: float = 0.0
+                      ) -> Iterator[tuple[str, list[float]]]:
+    """Сгенерировать воспроизводимые пакеты для тестов и замеров.
+
+    mix задаёт доли типов тренировок, по умолчанию типы равновероятны.
+    Значения полей берутся из `SAMPLE_DISTRIBUTIONS`, distributions
+    переопределяет их по имени поля: ('uniform', от, до),
+    ('normal', среднее, сигма, от, до) или ('choice', значения).
+    Доля invalid_rate пакетов портится: неизвестный тип, лишнее поле
+    или нулевая длительность.
+    """
+    import random
+
+    rnd = random.Random(seed)
+    mix = mix or dict.fromkeys(TRAININGS, 1)
+    types = list(mix)
+    weights = list(mix.values())
+    distributions = {**SAMPLE_DISTRIBUTIONS, **(distributions or {})}
+    for _ in range(count):
+        workout_type = rnd.choices(types, weights)[0]
+        data = [_sample(rnd, distributions.get(field, ('uniform', 1, 100)))
+                for field in TRAININGS[workout_type][0].FIELDS]
+        if invalid_rate and rnd.random() < invalid_rate:
+            kind = rnd.choice(INVALID_KINDS)
+            if kind == 'workout_type':
+                workout_type = 'XXX'
+            elif kind == 'arity':
+                data.append(1.0)
+            else:
+                data[1] = 0.0
+        yield workout_type, data
+
+
+def _encode_packages(packages: list[tuple[str, list[float]]],
+                     file_format: str) -> tuple[bytes, int]:
+    if file_format == 'binary':
+        valid = [(workout_type, data) for workout_type, data in packages
+                 if workout_type in WIRE_CODES
+                 and len(data) == TRAININGS[workout_type][1]]
+        return bytes(pack_packages(valid)), len(valid)
+    if file_format == 'text':
+        text = ''.join(' '.join([workout_type, *map(repr, data)]) + '\n'
+                       for workout_type, data in packages)
+        return text.encode(), len(packages)
+    raise ValueError(f'Неизвестный формат: {file_format}')
+
+
+def write_packages(path: str, count: int, file_format: str = 'text',
+                   block: int = 65536, repeat: bool = False, seed: int = 0,
+                   **options) -> int:
+    """Записать count сгенерированных пакетов в файл.
+
+    Пакеты генерируются и кодируются блоками по block штук, блок номер
+    i — с seed + i, так что все блоки разные. С repeat=True первый блок
+    пишется повторно: запись упирается в диск, но содержимое повторяется
+    каждые block пакетов, что искажает замеры кэша и дедупликации.
+    Формат `text` читает `parse_package`, `binary` —
+    `iter_binary_packages`; в binary не попадают пакеты неизвестного
+    типа и с лишними полями (запись их не хранит), из испорченных
+    остаются только пакеты с данными вне диапазона. options передаются
+    в `generate_packages`.
+    Возвращает число байт.
+    """
+    written = 0
+    with open(path, 'wb') as file:
+        if repeat:
+            encoded, size = _encode_packages(list(generate_packages(
+                min(block, count), seed=seed, **options
+            )), file_format)
+            full, rest = divmod(count, size) if size else (0, 0)
+            for _ in range(full):
+                written += file.write(encoded)
+            if rest:
+                written += file.write(encoded[:_prefix_size(encoded, rest,
+                                                            file_format)])
+            return written
+        for index, start in enumerate(range(0, count, block)):
+            encoded, _ = _encode_packages(list(generate_packages(
+                min(block, count - start), seed=seed + index, **options
+            )), file_format)
+            written += file.write(encoded)
+    return written
+
+
+def _prefix_size(encoded: bytes, rows: int, file_format: str) -> int:
+    if file_format == 'binary':
+        return rows * RECORD.size
+    position = 0
+    for _ in range(rows):
+        position = encoded.index(b'\n', position) + 1
+    return position
+
+
+RECORD = struct.Struct('<B7x5d')
+WIRE_CODES: dict[str, int] = {'SWM': 1, 'RUN': 2, 'WLK': 3}
+WIRE_TYPES: dict[int, str] = {code: workout_type
+                              for workout_type, code in WIRE_CODES.items()}
+
+
+def pack_packages(packages: Iterable[tuple[str, Sequence[float]]]
+                  ) -> bytearray:
+    """Упаковать пакеты в записи фиксированной длины.
+
+    Запись: байт кода тренировки, 7 байт выравнивания и 5 чисел double
+    (little-endian); неиспользуемые поля заполнены нулями.
+    """
+    buffer = bytearray()
+    for workout_type, data in packages:
+        buffer += RECORD.pack(WIRE_CODES[workout_type], *data,
+                              *[0.0] * (5 - len(data)))
+    return buffer
+
+
+def _record_view(buffer) -> memoryview:
+    view = memoryview(buffer).cast('B')
+    if len(view) % RECORD.size:
+        raise ValueError(f'Длина данных не кратна размеру записи '
+                         f'{RECORD.size} байт')
+    return view
+
+
+def _wire_type(code: int) -> str:
+    if code not in WIRE_TYPES:
+        raise ValueError(f'Неизвестный код тренировки в записи: {code}')
+    return WIRE_TYPES[code]
+
+
+def iter_binary_packages(buffer) -> Iterator[tuple[str, tuple[float, ...]]]:
+    """Читать пакеты из буфера записей, например из `mmap`.
+
+    Запись с неизвестным кодом тренировки поднимает ValueError.
+    """
+    for code, *data in RECORD.iter_unpack(_record_view(buffer)):
+        workout_type = _wire_type(code)
+        yield workout_type, tuple(data[:TRAININGS[workout_type][1]])
+
+
+def iter_binary_file(path: str) -> Iterator[tuple[str, tuple[float, ...]]]:
+    """Читать пакеты из файла записей, отображённого в память."""
+    import mmap
+
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter_binary_packages(mapped)
+
+
+def iter_binary_stream(stream: io.BufferedIOBase,
+                       chunk_size: int = CHUNK_SIZE
+                       ) -> Iterator[tuple[str, tuple[float, ...]]]:
+    """Читать пакеты из бинарного потока (например, stdin) кусками.
+
+    Неполная запись в конце потока поднимает ValueError.
+    """
+    size = max(1, chunk_size // RECORD.size) * RECORD.size
+    tail = b''
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunk = tail + chunk
+        whole = len(chunk) - len(chunk) % RECORD.size
+        yield from iter_binary_packages(memoryview(chunk)[:whole])
+        tail = chunk[whole:]
+    if tail:
+        yield from iter_binary_packages(tail)
+
+
+def binary_batches(buffer) -> dict[str, list[Sequence[float]]]:
+    """Разложить буфер записей на столбцы по типам тренировок.
+
+    Если в буфере один тип, столбцы — это срезы `memoryview` с шагом
+    в одну запись, без копирования данных. Иначе строки каждого типа
+    собираются в `TrainingBatch`.
+    """
+    view = _record_view(buffer)
+    present = set(view[::RECORD.size])
+    if len(present) == 1 and sys.byteorder == 'little':
+        workout_type = _wire_type(present.pop())
+        doubles = view.cast('d')
+        width = RECORD.size // doubles.itemsize
+        return {workout_type: [doubles[field + 1::width] for field
+                               in range(TRAININGS[workout_type][1])]}
+    batches: dict[str, TrainingBatch] = {}
+    for workout_type, data in iter_binary_packages(view):
+        if workout_type not in batches:
+            batches[workout_type] = TrainingBatch(workout_type)
+        batches[workout_type].append(data)
+    return {workout_type: batch.columns
+            for workout_type, batch in batches.items()}
+
+
+def calculate_binary(buffer) -> dict[str, BatchMetrics]:
+    """Посчитать показатели для буфера записей по типам тренировок."""
+    return calculate_batches(binary_batches(buffer))
+
+
+class LatencyStats:
+    """Задержки последних запросов и пропускная способность."""
+
+    def __init__(self, size: int = 100_000) -> None:
+        self.latencies: deque = deque(maxlen=size)
+        self.count = 0
+        self.started = time.perf_counter()
+
+    def add(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.count += 1
+
+    def percentile(self, percent: float) -> float:
+        """Получить перцентиль задержки в секундах."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def summary(self) -> dict[str, float]:
+        """Получить число запросов, p50, p99 (мс) и запросы в секунду."""
+        elapsed = time.perf_counter() - self.started
+        return {'count': self.count,
+                'p50_ms': self.percentile(50) * 1000,
+                'p99_ms': self.percentile(99) * 1000,
+                'throughput': self.count / elapsed if elapsed else 0.0}
+
+
+class MicroBatcher:
+    """Собирает одиночные запросы в пачки для `calculate_batch`.
+
+    Пачка отправляется на расчёт, когда в ней max_batch пакетов или
+    с прихода первого пакета прошло max_delay секунд.
+    """
+
+    def __init__(self, max_batch: int = 256, max_delay: float = 0.002):
+        import asyncio
+
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.stats = LatencyStats()
+
+    async def submit(self, workout_type: str, data: Sequence[float]) -> str:
+        """Поставить пакет в очередь и дождаться строки сообщения."""
+        import asyncio
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((workout_type, data, future,
+                              time.perf_counter()))
+        return await future
+
+    async def run(self) -> None:
+        """Собирать и считать пачки, пока задачу не отменят."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(),
+                                                        timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.compute(batch)
+
+    def compute(self, batch: list[tuple]) -> None:
+        """Посчитать пачку, сгруппировав пакеты по типу тренировки.
+
+        Отменённые запросы пропускаются. Ошибка расчёта группы, в том
+        числе из ядер плагина, достаётся только запросам этой группы.
+        """
+        groups: dict[str, list[tuple]] = {}
+        validator = get_validator()
+        for item in batch:
+            workout_type, data, future, _ = item
+            if future.done():
+                continue
+            error = validator.check(workout_type, data)
+            if error:
+                future.set_exception(ValueError(
+                    f'{ERRORS[error]}: {workout_type} {list(data)}'
+                ))
+                continue
+            groups.setdefault(workout_type, []).append(item)
+        for workout_type, items in groups.items():
+            try:
+                self._compute_group(workout_type, items)
+            except Exception as error:
+                for _, _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _compute_group(self, workout_type: str, items: list[tuple]) -> None:
+        training_class = TRAININGS[workout_type][0]
+        columns = list(zip(*[data for _, data, _, _ in items]))
+        metrics = calculate_batch(workout_type, columns)
+        for index, (_, data, future, started) in enumerate(items):
+            message = InfoMessage(
+                training_class.__name__, columns[1][index],
+                metrics.distance[index], metrics.speed[index],
+                metrics.calories[index]
+            ).get_message()
+            if not future.done():
+                future.set_result(message)
+                self.stats.add(time.perf_counter() - started)
+
+
+async def _respond(batcher: MicroBatcher, line: str) -> str:
+    import json
+
+    if line == 'STATS':
+        return json.dumps(batcher.stats.summary())
+    try:
+        return await batcher.submit(*parse_package(line))
+    except Exception as error:
+        return f'ERROR {error}'.replace('\n', ' ')
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765,
+                path: str | None = None, max_batch: int = 256,
+                max_delay: float = 0.002, started=None) -> None:
+    """Запустить сервер расчёта пакетов на TCP или Unix-сокете.
+
+    Каждая строка запроса — пакет в формате `parse_package`, ответ —
+    строка сообщения или `ERROR ...`. Строка `STATS` возвращает JSON
+    с задержками и пропускной способностью. Если передан started
+    (`asyncio.Future`), в него кладётся запущенный сервер.
+    """
+    import asyncio
+
+    batcher = MicroBatcher(max_batch, max_delay)
+
+    async def handle(reader, writer):
+        try:
+            async for line in reader:
+                line = line.decode().strip()
+                if line:
+                    response = await _respond(batcher, line)
+                    writer.write(response.encode() + b'\n')
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    worker = asyncio.create_task(batcher.run())
+    if path:
+        server = await asyncio.start_unix_server(handle, path)
+    else:
+        server = await asyncio.start_server(handle, host, port)
+    if started is not None:
+        started.set_result(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
+
+
+async def load_test(packages: Sequence[tuple[str, Sequence[float]]],
+                    host: str = '127.0.0.1', port: int = 8765,
+                    path: str | None = None,
+                    connections: int = 32) -> dict[str, float]:
+    """Нагрузить сервер пакетами из нескольких соединений.
+
+    Возвращает сводку `LatencyStats` по задержкам на стороне клиента.
+    """
+    import asyncio
+
+    stats = LatencyStats(len(packages) or 1)
+
+    async def client(share):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        for workout_type, data in share:
+            started = time.perf_counter()
+            line = ' '.join([workout_type, *map(str, data)])
+            writer.write(line.encode() + b'\n')
+            await writer.drain()
+            await reader.readline()
+            stats.add(time.perf_counter() - started)
+        writer.close()
+        await writer.wait_closed()
+
+    stats.started = time.perf_counter()
+    await asyncio.gather(*[client(packages[index::connections])
+                           for index in range(connections)])
+    return stats.summary()
+
+
+class SessionStore:
+    """Хранилище пакетов на диске с доступом по номеру через `mmap`.
+
+    Файл — заголовок и записи `RECORD`, только дописывается. Номер
+    сессии однозначно задаёт смещение записи. Дописываются только
+    корректные пакеты. Неполная запись в конце (после сбоя во время
+    записи) отрезается при открытии. Для каждого типа тренировки по
+    требованию строится список номеров его записей.
+    """
+    HEADER = struct.Struct(f'<8sII{RECORD.size - 16}x')
+    MAGIC = b'HWSTORE1'
+    VERSION = 1
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, 'a+b')
+        self.file.seek(0)
+        header = self.file.read(self.HEADER.size)
+        if not header:
+            self.file.write(self.HEADER.pack(self.MAGIC, self.VERSION,
+                                             RECORD.size))
+            self.file.flush()
+        elif (len(header) != self.HEADER.size
+              or self.HEADER.unpack(header) != (self.MAGIC, self.VERSION,
+                                                RECORD.size)):
+            self.file.close()
+            raise ValueError(f'{path} не является хранилищем сессий')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = (size - self.HEADER.size) // RECORD.size
+        if size != self.HEADER.size + self.count * RECORD.size:
+            self.file.truncate(self.HEADER.size + self.count * RECORD.size)
+        self.index: dict[str, array] = {}
+        self._mapped = None
+        self._mapped_count = -1
+
+    def extend(self, packages: Iterable[tuple[str, Sequence[float]]]) -> None:
+        """Дописать пакеты в конец хранилища.
+
+        Пакеты проверяются `get_validator()` до записи: при первом
+        некорректном пакете ValueError, и ничего не дописывается.
+        """
+        packages = list(packages)
+        check = get_validator().check
+        for workout_type, data in packages:
+            error = check(workout_type, data)
+            if error:
+                raise ValueError(
+                    f'{ERRORS[error]}: {workout_type} {list(data)}'
+                )
+        self.file.write(pack_packages(packages))
+        self.file.flush()
+        for workout_type, _ in packages:
+            if workout_type in self.index:
+                self.index[workout_type].append(self.count)
+            self.count += 1
+
+    def append(self, workout_type: str, data: Sequence[float]) -> int:
+        """Дописать пакет и вернуть номер сессии."""
+        self.extend([(workout_type, data)])
+        return self.count - 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def records(self, start: int = 0,
+                stop: int | None = None) -> memoryview:
+        """Получить записи сессий [start, stop) без копирования."""
+        import mmap
+
+        if self._mapped_count != self.count:
+            if self.count:
+                self._mapped = memoryview(mmap.mmap(
+                    self.file.fileno(), 0, access=mmap.ACCESS_READ
+                ))[self.HEADER.size:]
+            self._mapped_count = self.count
+        if not self.count:
+            return memoryview(b'')
+        start, stop, _ = slice(start, stop).indices(self.count)
+        return self._mapped[start * RECORD.size:stop * RECORD.size]
+
+    def package(self, index: int) -> tuple[str, tuple[float, ...]]:
+        """Получить пакет сессии по номеру."""
+        if not -self.count <= index < self.count:
+            raise IndexError(index)
+        index %= self.count
+        return next(iter_binary_packages(self.records(index, index + 1)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step == 1:
+                packages = iter_binary_packages(self.records(start, stop))
+            else:
+                packages = map(self.package, range(start, stop, step))
+            return [TRAININGS[workout_type][0](*data)
+                    for workout_type, data in packages]
+        workout_type, data = self.package(index)
+        return TRAININGS[workout_type][0](*data)
+
+    def indices(self, workout_type: str) -> array:
+        """Получить номера сессий одного типа тренировки."""
+        if workout_type not in self.index:
+            code = WIRE_CODES[workout_type]
+            self.index[workout_type] = array('Q', [
+                number for number, value
+                in enumerate(self.records()[::RECORD.size]) if value == code
+            ])
+        return self.index[workout_type]
+
+    def columns(self, start: int = 0,
+                stop: int | None = None) -> dict[str, list[Sequence]]:
+        """Получить столбцы сессий [start, stop) по типам тренировок."""
+        return binary_batches(self.records(start, stop))
+
+    def close(self) -> None:
+        self._mapped = None
+        self._mapped_count = -1
+        self.file.close()
+
+    def __enter__(self) -> 'SessionStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class SessionIndex:
+    """Индексы сессий по типу тренировки и показателям.
+
+    Для каждого типа хранится битовая карта номеров сессий, для каждого
+    показателя `InfoMessage` — отсортированный список значений и
+    небольшой отсортированный хвост, куда новые сессии вставляются
+    бинарным поиском. Хвост вливается в основной список, когда
+    становится длиннее `MERGE_MIN` и `TAIL_FACTOR` корней из размера
+    списка, поэтому добавление в среднем стоит O(√n). Запрос ищет
+    границы в списке и хвосте бинарным поиском, начинает с самого
+    узкого диапазона и проверяет остальные условия только у попавших
+    в него сессий.
+    """
+    METRICS = ('duration', 'distance', 'speed', 'calories')
+    MERGE_MIN = 256
+    TAIL_FACTOR = 16
+
+    def __init__(self) -> None:
+        self.bitmaps: dict[str, bytearray] = {}
+        self.keys: dict[str, list[float]] = {name: [] for name in self.METRICS}
+        self.ids: dict[str, list[int]] = {name: [] for name in self.METRICS}
+        self.tail_keys: dict[str, list[float]] = {
+            name: [] for name in self.METRICS
+        }
+        self.tail_ids: dict[str, list[int]] = {
+            name: [] for name in self.METRICS
+        }
+        self.rows: dict[int, tuple[str, tuple]] = {}
+        self.synced = 0
+
+    def _add_row(self, session_id: int, workout_type: str,
+                 values: tuple) -> None:
+        bitmap = self.bitmaps.setdefault(workout_type, bytearray())
+        byte, bit = divmod(session_id, 8)
+        if len(bitmap) <= byte:
+            bitmap.extend(bytes(byte + 1 - len(bitmap)))
+        bitmap[byte] |= 1 << bit
+        self.rows[session_id] = (workout_type, values)
+
+    def _merge(self, name: str, keys: list[float], ids: list[int]) -> None:
+        """Влить отсортированные keys и ids в основной список показателя."""
+        keys = self.keys[name] + keys
+        ids = self.ids[name] + ids
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys[name] = [keys[number] for number in order]
+        self.ids[name] = [ids[number] for number in order]
+
+    def add(self, session_id: int, workout_type: str,
+            info: InfoMessage) -> None:
+        """Добавить сессию с посчитанным сообщением в индексы."""
+        values = attrgetter(*self.METRICS)(info)
+        self._add_row(session_id, workout_type, values)
+        for name, value in zip(self.METRICS, values):
+            keys, ids = self.tail_keys[name], self.tail_ids[name]
+            position = bisect_right(keys, value)
+            keys.insert(position, value)
+            ids.insert(position, session_id)
+            if len(keys) > max(self.MERGE_MIN,
+                               self.TAIL_FACTOR
+                               * int(len(self.keys[name]) ** 0.5)):
+                self._merge(name, keys, ids)
+                self.tail_keys[name], self.tail_ids[name] = [], []
+
+    def add_package(self, session_id: int, workout_type: str,
+                    data: Sequence[float]) -> None:
+        """Посчитать пакет и добавить его в индексы."""
+        self.add(session_id, workout_type,
+                 read_package(workout_type, data).show_training_info())
+
+    def sync(self, store: 'SessionStore',
+             rejected: dict[int, int] | None = None) -> int:
+        """Добавить сессии, дописанные в хранилище после прошлого вызова.
+
+        Новые записи читаются столбцами, проверяются `get_validator()`
+        и считаются `calculate_batch` по одному разу на тип тренировки,
+        затем вливаются в индексы одной сортировкой на показатель.
+        Некорректные записи пропускаются, их число по кодам ошибок
+        добавляется в rejected. Возвращает число добавленных сессий.
+        """
+        start, stop = self.synced, len(store)
+        ids: dict[int, list[int]] = {}
+        for number, code in enumerate(store.records(start, stop)
+                                      [::RECORD.size], start):
+            ids.setdefault(code, []).append(number)
+        added: list[int] = []
+        added_values: list[list[float]] = [[] for _ in self.METRICS]
+        validator = get_validator()
+        for workout_type, columns in store.columns(start, stop).items():
+            mask, errors = validator.validate_columns(workout_type, columns)
+            if rejected is not None:
+                for error in filter(None, errors):
+                    rejected[error] = rejected.get(error, 0) + 1
+            columns = [list(compress(column, mask)) for column in columns]
+            metrics = calculate_batch(workout_type, columns)
+            session_ids = list(compress(ids[WIRE_CODES[workout_type]], mask))
+            values = (columns[1], metrics.distance, metrics.speed,
+                      metrics.calories)
+            for session_id, row in zip(session_ids, zip(*values)):
+                self._add_row(session_id, workout_type, row)
+            added += session_ids
+            for column, metric in zip(added_values, values):
+                column.extend(metric)
+        for name, values in zip(self.METRICS, added_values):
+            order = sorted(range(len(values)), key=values.__getitem__)
+            self._merge(name, [values[number] for number in order],
+                        [added[number] for number in order])
+        self.synced = stop
+        return len(added)
+
+    def _has_type(self, workout_type: str, session_id: int) -> bool:
+        bitmap = self.bitmaps.get(workout_type, b'')
+        byte, bit = divmod(session_id, 8)
+        return byte < len(bitmap) and bool(bitmap[byte] >> bit & 1)
+
+    def _type_ids(self, workout_type: str) -> list[int]:
+        return [byte * 8 + bit
+                for byte, value in enumerate(self.bitmaps.get(workout_type,
+                                                              b''))
+                if value for bit in range(8) if value >> bit & 1]
+
+    def _bounds(self, name: str, low: float | None,
+                high: float | None) -> list[tuple[int, int, list[int]]]:
+        """Границы [low, high] показателя в основном списке и в хвосте."""
+        bounds = []
+        for keys, ids in ((self.keys[name], self.ids[name]),
+                          (self.tail_keys[name], self.tail_ids[name])):
+            start = 0 if low is None else bisect_left(keys, low)
+            stop = len(keys) if high is None else bisect_right(keys, high)
+            bounds.append((start, stop, ids))
+        return bounds
+
+    def query(self, workout_type: str | None = None,
+              **ranges: tuple[float | None, float | None]
+              ) -> list[int]:
+        """Найти номера сессий по типу и диапазонам показателей.
+
+        Диапазоны задаются как duration=(1, None), calories=(300, 500);
+        границы включаются, None — без ограничения.
+        """
+        bounds = {}
+        for name, (low, high) in ranges.items():
+            if name not in self.keys:
+                raise ValueError(f'Неизвестный показатель: {name}')
+            bounds[name] = self._bounds(name, low, high)
+        if bounds:
+            name = min(bounds, key=lambda key: sum(
+                stop - start for start, stop, _ in bounds[key]
+            ))
+            candidates = chain.from_iterable(
+                ids[start:stop] for start, stop, ids in bounds[name]
+            )
+        elif workout_type is not None:
+            return self._type_ids(workout_type)
+        else:
+            return sorted(self.rows)
+        checks = [(self.METRICS.index(name), *ranges[name])
+                  for name in bounds]
+        result = []
+        for session_id in candidates:
+            if (workout_type is not None
+                    and not self._has_type(workout_type, session_id)):
+                continue
+            values = self.rows[session_id][1]
+            if all((low is None or values[index] >= low)
+                   and (high is None or values[index] <= high)
+                   for index, low, high in checks):
+                result.append(session_id)
+        return sorted(result)
+
+
+class RollingAggregator:
+    """Итоги тренировок по пользователю за день и за неделю.
+
+    Каждая тренировка обновляет счётчики своих окон за O(1), без
+    пересчёта истории. Исправленный пакет отменяется через `retract`.
+    Окна считаются по UTC, неделя начинается с понедельника.
+    """
+    WINDOWS = {'day': 24 * 60 * 60, 'week': 7 * 24 * 60 * 60}
+    EPOCH_SHIFT = {'day': 0, 'week': 3 * 24 * 60 * 60}
+
+    def __init__(self) -> None:
+        self.totals: dict[tuple[str, str, int], list[float]] = {}
+
+    def window_start(self, window: str, timestamp: float) -> int:
+        """Получить начало окна (unix-время), в которое попадает момент."""
+        size = self.WINDOWS[window]
+        shift = self.EPOCH_SHIFT[window]
+        return int((timestamp + shift) // size * size - shift)
+
+    def add(self, user: str, timestamp: float, training: Training,
+            sign: int = 1) -> None:
+        """Учесть тренировку во всех окнах пользователя."""
+        values = (sign, sign * training.duration,
+                  sign * training.get_distance(),
+                  sign * training.get_spent_calories())
+        for window in self.WINDOWS:
+            key = (user, window, self.window_start(window, timestamp))
+            totals = self.totals.setdefault(key, [0, 0.0, 0.0, 0.0])
+            for index, value in enumerate(values):
+                totals[index] += value
+            if not totals[0]:
+                del self.totals[key]
+
+    def retract(self, user: str, timestamp: float,
+                training: Training) -> None:
+        """Отменить ранее учтённую тренировку."""
+        self.add(user, timestamp, training, sign=-1)
+
+    def get_totals(self, user: str, window: str,
+                   timestamp: float) -> dict[str, float]:
+        """Получить суммы и средние за окно, содержащее момент."""
+        count, duration, distance, calories = self.totals.get(
+            (user, window, self.window_start(window, timestamp)),
+            (0, 0.0, 0.0, 0.0)
+        )
+        return {'count': count, 'duration': duration,
+                'distance': distance, 'calories': calories,
+                'mean_distance': distance / count if count else 0.0,
+                'mean_calories': calories / count if count else 0.0}
+
+    def save(self, path: str) -> None:
+        """Сохранить состояние в JSON, заменив файл атомарно."""
+        import json
+
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump([[*key, *totals]
+                       for key, totals in self.totals.items()], file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RollingAggregator':
+        """Восстановить состояние из файла `save`."""
+        import json
+
+        aggregator = cls()
+        with open(path, encoding='utf-8') as file:
+            for user, window, start, *totals in json.load(file):
+                aggregator.totals[(user, window, start)] = totals
+        return aggregator
+
+
+FORMULAS = ('distance_kernel', 'speed_kernel', 'calories_kernel',
+            'get_distance', 'get_mean_speed', 'get_spent_calories')
+
+
+def formula_fingerprint(training_class: type[Training]) -> str:
+    """Получить отпечаток констант и формул класса тренировки.
+
+    Меняется при изменении любой константы (`LEN_STEP`, `CALORIES_*`
+    и т.д.), кода `*_kernel` или поштучных формул, поэтому старые
+    записи кэша перестают совпадать.
+    """
+    import hashlib
+
+    constants = sorted((name, repr(getattr(training_class, name)))
+                       for name in dir(training_class) if name.isupper())
+    code = []
+    for name in FORMULAS:
+        function = getattr(training_class, name)
+        function = getattr(function, '__func__', function)
+        function = getattr(function, '__wrapped__', function)
+        code.append((function.__code__.co_code,
+                     repr(function.__code__.co_consts)))
+    return hashlib.blake2b(
+        repr((training_class.__qualname__, constants, code)).encode(),
+        digest_size=16
+    ).hexdigest()
+
+
+class ResultCache:
+    """Кэш сообщений о тренировках по содержимому пакета.
+
+    Первый уровень — LRU в памяти на maxsize записей, второй
+    (если задан path) — таблица SQLite не больше disk_maxsize записей.
+    Новые записи копятся и пишутся на диск одной транзакцией по
+    commit_every штук (и в `flush`/`close`); самые старые записи
+    удаляются, только когда число строк превысило disk_maxsize.
+    Записи старше ttl секунд считаются промахом. В ключ входит
+    `formula_fingerprint`, так что изменение формул сбрасывает кэш.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float | None = None,
+                 path: str | None = None,
+                 disk_maxsize: int = 1_000_000,
+                 commit_every: int = 1000) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_maxsize = disk_maxsize
+        self.commit_every = commit_every
+        self.memory: OrderedDict = OrderedDict()
+        self.fingerprints: dict[type, str] = {}
+        self.hits = self.disk_hits = self.misses = 0
+        self.connection = None
+        self.pending: dict[str, tuple] = {}
+        self.disk_count = 0
+        if path is not None:
+            import sqlite3
+
+            self.connection = sqlite3.connect(path)
+            with self.connection:
+                self.connection.execute(
+                    'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY '
+                    'KEY, created REAL, training_type TEXT, duration REAL, '
+                    'distance REAL, speed REAL, calories REAL)'
+                )
+                self.connection.execute(
+                    'CREATE INDEX IF NOT EXISTS results_created '
+                    'ON results (created)'
+                )
+            self.disk_count = self.connection.execute(
+                'SELECT COUNT(*) FROM results'
+            ).fetchone()[0]
+
+    def key(self, workout_type: str, data: Sequence[float]) -> str:
+        """Получить ключ пакета с учётом формул его класса."""
+        import hashlib
+
+        training_class = TRAININGS[workout_type][0]
+        if training_class not in self.fingerprints:
+            self.fingerprints[training_class] = formula_fingerprint(
+                training_class
+            )
+        return hashlib.blake2b(repr((
+            workout_type, [float(value) for value in data],
+            self.fingerprints[training_class]
+        )).encode(), digest_size=16).hexdigest()
+
+    def _fresh(self, created: float) -> bool:
+        return self.ttl is None or time.time() - created <= self.ttl
+
+    def _remember(self, key: str, created: float, fields: tuple) -> None:
+        self.memory[key] = (created, fields)
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def _from_disk(self, key: str) -> tuple | None:
+        if key in self.pending:
+            return self.pending[key][1:]
+        return self.connection.execute(
+            'SELECT created, training_type, duration, distance, speed, '
+            'calories FROM results WHERE key = ?', (key,)
+        ).fetchone()
+
+    def _to_disk(self, key: str, created: float, fields: tuple,
+                 stored: bool) -> None:
+        if not stored and key not in self.pending:
+            self.disk_count += 1
+        self.pending[key] = (key, created, *fields)
+        if len(self.pending) >= self.commit_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записать накопленные записи и вытеснить лишние с диска."""
+        if self.connection is None or not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                self.pending.values()
+            )
+            if self.disk_count > self.disk_maxsize:
+                self.connection.execute(
+                    'DELETE FROM results WHERE key IN (SELECT key FROM '
+                    'results ORDER BY created LIMIT ?)',
+                    (self.disk_count - self.disk_maxsize,)
+                )
+                self.disk_count = self.disk_maxsize
+        self.pending.clear()
+
+    def get_info(self, workout_type: str,
+                 data: Sequence[float]) -> InfoMessage:
+        """Получить сообщение о тренировке из кэша или посчитать его."""
+        key = self.key(workout_type, data)
+        cached = self.memory.get(key)
+        if cached is not None and self._fresh(cached[0]):
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return InfoMessage(*cached[1])
+        row = None
+        if self.connection is not None:
+            row = self._from_disk(key)
+            if row is not None and self._fresh(row[0]):
+                self.disk_hits += 1
+                self._remember(key, row[0], row[1:])
+                return InfoMessage(*row[1:])
+        self.misses += 1
+        info = read_package(workout_type, data).show_training_info()
+        fields = (info.training_type, info.duration, info.distance,
+                  info.speed, info.calories)
+        created = time.time()
+        self._remember(key, created, fields)
+        if self.connection is not None:
+            self._to_disk(key, created, fields, row is not None)
+        return info
+
+    def stats(self) -> dict[str, int]:
+        """Получить число попаданий и промахов по уровням."""
+        return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                'misses': self.misses, 'size': len(self.memory)}
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+
+EXPORT_FIELDS = ('training_type', 'duration', 'distance', 'speed', 'calories')
+
+
+def _export_csv(chunk: list[InfoMessage], output: io.TextIOBase) -> None:
+    import csv
+
+    csv.writer(output, lineterminator='\n').writerows(
+        [attrgetter(*EXPORT_FIELDS)(info) for info in chunk]
+    )
+
+
+def _export_jsonl(chunk: list[InfoMessage], output: io.TextIOBase) -> None:
+    import json
+
+    output.write(''.join([
+        json.dumps(dict(zip(EXPORT_FIELDS,
+                            attrgetter(*EXPORT_FIELDS)(info))),
+                   ensure_ascii=False) + '\n'
+        for info in chunk
+    ]))
+
+
+def _export_text(chunk: list[InfoMessage], output: io.TextIOBase) -> None:
+    render_many(chunk, output, len(chunk))
+
+
+def _export_arrow(messages: Iterable[InfoMessage], path: str,
+                  file_format: str, chunk_size: int) -> int:
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema([('training_type', pyarrow.string())]
+                            + [(name, pyarrow.float64())
+                               for name in EXPORT_FIELDS[1:]])
+    if file_format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pyarrow.ipc.new_file(path, schema)
+    count = 0
+    with writer:
+        for chunk in _chunks(messages, chunk_size):
+            columns = list(zip(*[attrgetter(*EXPORT_FIELDS)(info)
+                                 for info in chunk]))
+            writer.write_table(pyarrow.table(dict(zip(EXPORT_FIELDS,
+                                                      columns)),
+                                             schema=schema))
+            count += len(chunk)
+    return count
+
+
+EXPORTERS: dict[str, Callable] = {
+    'csv': _export_csv,
+    'jsonl': _export_jsonl,
+    'text': _export_text,
+}
+
+
+def export_messages(messages: Iterable[InfoMessage], output,
+                    file_format: str = 'csv',
+                    chunk_size: int = 10000) -> int:
+    """Выгрузить сообщения кусками по chunk_size строк.
+
+    Форматы `csv` (с заголовком), `jsonl` и `text` пишутся в текстовый
+    поток output; `parquet` и `arrow` — в файл по пути output
+    и требуют установленного pyarrow. Возвращает число сообщений.
+    """
+    if file_format in ('parquet', 'arrow'):
+        return _export_arrow(messages, output, file_format, chunk_size)
+    if file_format not in EXPORTERS:
+        raise ValueError(f'Неизвестный формат выгрузки: {file_format}')
+    exporter = EXPORTERS[file_format]
+    if file_format == 'csv':
+        output.write(','.join(EXPORT_FIELDS) + '\n')
+    count = 0
+    for chunk in _chunks(messages, chunk_size):
+        exporter(chunk, output)
+        count += len(chunk)
+    return count
+
+
+class TrainingCurve:
+    """Кривые тренировки по интервалам замеров.
+
+    time — конец интервала в часах от начала, distance и calories —
+    накопленные значения, speed — скользящая средняя скорость в км/ч.
+    """
+
+    def __init__(self, time: array, distance: array, speed: array,
+                 calories: array) -> None:
+        self.time = time
+        self.distance = distance
+        self.speed = speed
+        self.calories = calories
+
+    def downsample(self, factor: int) -> 'TrainingCurve':
+        """Оставить каждую factor-ю точку, усреднив скорость по группе."""
+        last = range(factor - 1, len(self.time), factor)
+        speed = array('d', [
+            sum(self.speed[index - factor + 1:index + 1]) / factor
+            for index in last
+        ])
+        return TrainingCurve(array('d', [self.time[i] for i in last]),
+                             array('d', [self.distance[i] for i in last]),
+                             speed,
+                             array('d', [self.calories[i] for i in last]))
+
+
+def calculate_curve(workout_type: str, actions: Sequence[float], *fields,
+                    interval: float = 1.0, window: int = 1) -> TrainingCurve:
+    """Посчитать кривые дистанции, скорости и калорий по замерам.
+
+    actions — шаги или гребки за каждый интервал в interval секунд.
+    fields — остальные поля после `duration` в порядке `FIELDS` (вес,
+    рост, длина бассейна, число бассейнов за интервал), число или
+    последовательность по интервалам. Скорость сглаживается скользящим
+    средним по window интервалам. Для бега и плавания накопленные
+    калории в конце совпадают с `get_spent_calories` всей тренировки.
+    """
+    from itertools import accumulate, repeat
+
+    training_class, arity = TRAININGS[workout_type]
+    if len(fields) != arity - 2:
+        raise ValueError(f'Ожидалось полей после duration: {arity - 2}, '
+                         f'получено: {len(fields)}')
+    size = len(actions)
+    step = interval / (training_class.MIN_IN_H * training_class.MIN_IN_H)
+    columns = [actions, repeat(step, size)] + [
+        value if hasattr(value, '__len__') else repeat(value, size)
+        for value in fields
+    ]
+    columns = [list(column) for column in columns]
+    distance = list(map(training_class.distance_kernel, *columns))
+    speed = list(map(training_class.speed_kernel, distance, *columns))
+    calories = map(training_class.calories_kernel, speed, *columns)
+    moved = list(accumulate(map(lambda value, hours: value * hours,
+                                speed, columns[1]), initial=0.0))
+    smooth = array('d', [
+        (moved[index + 1] - moved[max(0, index + 1 - window)])
+        / (min(index + 1, window) * step)
+        for index in range(size)
+    ])
+    return TrainingCurve(array('d', accumulate(repeat(step, size))),
+                         array('d', accumulate(distance)),
+                         smooth,
+                         array('d', accumulate(calories)))
+
+
+ROW_BYTES = 512
+
+
+def _read_chunk(file, rows: int) -> tuple[list[tuple], int]:
+    packages = []
+    invalid = 0
+    while len(packages) + invalid < rows:
+        line = file.readline()
+        if not line:
+            break
+        line = line.decode('utf-8').strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            packages.append(parse_package(line))
+        except ValueError:
+            invalid += 1
+    return packages, invalid
+
+
+def _spill_chunk(packages: list[tuple],
+                 spill: str) -> tuple[dict[str, dict[str, float]], int]:
+    mask, _ = get_validator().validate(packages)
+    batches: dict[str, TrainingBatch] = {}
+    for workout_type, data in compress(packages, mask):
+        if workout_type not in batches:
+            batches[workout_type] = TrainingBatch(workout_type)
+        batches[workout_type].append(data)
+    totals = {}
+    with open(spill, 'w', encoding='utf-8') as output:
+        output.write(','.join(EXPORT_FIELDS) + '\n')
+        for workout_type, batch in batches.items():
+            metrics = batch.metrics()
+            durations = batch.columns[1]
+            totals[workout_type] = {
+                'count': len(batch), 'duration': sum(durations),
+                'distance': sum(metrics.distance),
+                'calories': sum(metrics.calories),
+            }
+            name = batch.training_class.__name__
+            for chunk in _chunks(zip(durations, metrics.distance,
+                                     metrics.speed, metrics.calories),
+                                 CHUNK_SIZE):
+                _export_csv([InfoMessage(name, *row) for row in chunk],
+                            output)
+    return totals, len(packages) - sum(mask)
+
+
+def process_out_of_core(path: str, workdir: str,
+                        memory_limit: int = 64 << 20,
+                        chunk_rows: int | None = None) -> dict:
+    """Обработать файл пакетов, который не помещается в память.
+
+    Файл читается блоками по chunk_rows строк (по умолчанию столько,
+    сколько помещается в memory_limit байт). Результаты блока пишутся
+    в `chunk-NNNNN.csv` в workdir, после чего `manifest.json`
+    заменяется нарастающими итогами и смещением конца блока; его
+    размер не зависит от числа блоков. Повторный запуск продолжает
+    с последнего законченного блока. Возвращает суммы по типам
+    тренировок, число некорректных пакетов и список файлов блоков.
+    """
+    import json
+
+    os.makedirs(workdir, exist_ok=True)
+    manifest_path = os.path.join(workdir, 'manifest.json')
+    chunk_rows = chunk_rows or max(1, memory_limit // ROW_BYTES)
+    manifest = {'source': os.path.abspath(path), 'end': 0, 'chunks': 0,
+                'invalid': 0, 'totals': {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as file:
+            manifest = json.load(file)
+        if manifest['source'] != os.path.abspath(path):
+            raise ValueError(f'{workdir} уже содержит результаты '
+                             f'для {manifest["source"]}')
+    with open(path, 'rb') as file:
+        file.seek(manifest['end'])
+        while True:
+            packages, invalid = _read_chunk(file, chunk_rows)
+            if not packages and not invalid:
+                break
+            totals, rejected = _spill_chunk(
+                packages, _spill_path(workdir, manifest['chunks'])
+            )
+            _add_totals(manifest['totals'], totals)
+            manifest['invalid'] += invalid + rejected
+            manifest['chunks'] += 1
+            manifest['end'] = file.tell()
+            temporary = f'{manifest_path}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as output:
+                json.dump(manifest, output)
+            os.replace(temporary, manifest_path)
+    return {'totals': manifest['totals'], 'invalid': manifest['invalid'],
+            'spills': [_spill_path(workdir, number)
+                       for number in range(manifest['chunks'])]}
+
+
+def _spill_path(workdir: str, number: int) -> str:
+    return os.path.join(workdir, f'chunk-{number:05d}.csv')
+
+
+def _add_totals(totals: dict[str, dict[str, float]],
+                chunk: dict[str, dict[str, float]]) -> None:
+    for workout_type, values in chunk.items():
+        merged = totals.setdefault(workout_type, dict.fromkeys(values, 0))
+        for name, value in values.items():
+            merged[name] += value
+
+
+def bench(count: int = 100_000, seed: int = 0) -> dict[str, float]:
+    """Замерить пакеты в секунду по стадиям на сгенерированных данных."""
+    packages = list(generate_packages(count, seed=seed))
+    started = time.perf_counter()
+    trainings = [read_package(*package) for package in packages]
+    read = time.perf_counter()
+    messages = [training.show_training_info() for training in trainings]
+    computed = time.perf_counter()
+    render_many(messages)
+    rendered = time.perf_counter()
+    return {'read_package': count / (read - started),
+            'show_training_info': count / (computed - read),
+            'render': count / (rendered - computed),
+            'total': count / (rendered - started)}
+
+
+COMMANDS = ('compute', 'batch', 'serve', 'bench')
+
+
+def _cli_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='homework', description='Расчёт показателей тренировок.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    compute = commands.add_parser(
+        'compute', help='посчитать текстовые пакеты построчно'
+    )
+    compute.add_argument('paths', nargs='*', help='файлы, `-` — stdin')
+    batch = commands.add_parser(
+        'batch', help='посчитать пакеты пачками с машинной выгрузкой'
+    )
+    batch.add_argument('paths', nargs='*', help='файлы, `-` — stdin')
+    batch.add_argument('--binary', action='store_true',
+                       help='файлы в формате записей RECORD')
+    batch.add_argument('--format', default='csv',
+                       choices=('csv', 'jsonl', 'text'))
+    batch.add_argument('--workers', type=int, default=0,
+                       help='число процессов, 0 — без пула')
+    batch.add_argument('--chunk-size', type=int, default=10000)
+    serve_parser = commands.add_parser('serve', help='запустить сервер')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--path', help='путь Unix-сокета')
+    serve_parser.add_argument('--max-batch', type=int, default=256)
+    serve_parser.add_argument('--max-delay', type=float, default=0.002)
+    bench_parser = commands.add_parser('bench', help='замерить скорость')
+    bench_parser.add_argument('--count', type=int, default=100_000)
+    return parser
+
+
+def _cli_packages(args) -> Iterator[tuple[str, Sequence[float]]]:
+    if not args.binary:
+        yield from stream_packages(read_lines(args.paths))
+        return
+    for path in args.paths or ['-']:
+        if path == '-':
+            yield from iter_binary_stream(sys.stdin.buffer)
+        else:
+            yield from iter_binary_file(path)
+
+
+def cli(argv: Sequence[str] | None = None) -> int:
+    """Точка входа командной строки: compute, batch, serve, bench.
+
+    Тяжёлые модули (argparse, asyncio, пул процессов) импортируются
+    только нужной подкомандой. Вызов без подкоманды — это `compute`.
+    `compute` и `batch` проверяют пакеты до расчёта: некорректные
+    пропускаются и дают код возврата 1, остальные выводятся.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ('-h',
+                                                               '--help'):
+        argv.insert(0, 'compute')
+    args = _cli_parser().parse_args(argv)
+    rejected: dict[int, int] = {}
+    try:
+        if args.command == 'compute':
+            run_stream(args.paths, rejected=rejected)
+        elif args.command == 'batch':
+            packages = filter_packages(_cli_packages(args), rejected)
+            if args.workers:
+                messages = process_parallel(packages, args.workers,
+                                            args.chunk_size)
+            else:
+                messages = (read_package(*package).show_training_info()
+                            for package in packages)
+            export_messages(messages, sys.stdout, args.format,
+                            args.chunk_size)
+            report_rejected(rejected)
+        elif args.command == 'serve':
+            import asyncio
+
+            asyncio.run(serve(args.host, args.port, args.path,
+                              args.max_batch, args.max_delay))
+        else:
+            for stage, rate in bench(args.count).items():
+                print(f'{stage}: {rate:,.0f} пакетов/с')
+    except (OSError, ValueError) as error:
+        print(f'Ошибка: {error}', file=sys.stderr)
+        return 1
+    return 1 if rejected else 0
+
+
+class SharedResults:
+    """Столбцы результатов расчёта в `multiprocessing.shared_memory`.
+
+    Хранит код тренировки (`WIRE_CODES`), длительность, дистанцию,
+    скорость и калории для size пакетов. Процессы и потоки пишут
+    в непересекающиеся диапазоны строк без блокировок, родитель читает
+    столбцы без копирования, а `InfoMessage` создаёт только `messages`.
+    """
+    COLUMNS = EXPORT_FIELDS[1:]
+
+    def __init__(self, size: int, name: str | None = None) -> None:
+        from multiprocessing import shared_memory
+
+        width = len(self.COLUMNS) * 8 + 1
+        self.size = size
+        self.memory = shared_memory.SharedMemory(
+            name=name, create=name is None, size=max(1, size * width)
+        )
+        doubles = self.memory.buf[:size * (width - 1)].cast('d')
+        self.columns = {
+            column: doubles[index * size:(index + 1) * size]
+            for index, column in enumerate(self.COLUMNS)
+        }
+        self.codes = self.memory.buf[size * (width - 1):size * width]
+        self._views = [doubles, self.codes, *self.columns.values()]
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def write(self, start: int, messages: Iterable[InfoMessage],
+              codes: Iterable[int]) -> int:
+        """Записать сообщения в строки начиная со start."""
+        count = 0
+        getter = attrgetter(*self.COLUMNS)
+        for index, (info, code) in enumerate(zip(messages, codes), start):
+            self.codes[index] = code
+            for column, value in zip(self._views[2:], getter(info)):
+                column[index] = value
+            count += 1
+        return count
+
+    def messages(self, start: int = 0,
+                 stop: int | None = None) -> Iterator[InfoMessage]:
+        """Создавать `InfoMessage` по строкам только при переборе."""
+        names = {code: TRAININGS[workout_type][0].__name__
+                 for code, workout_type in WIRE_TYPES.items()}
+        for index in range(*slice(start, stop).indices(self.size)):
+            yield InfoMessage(names[self.codes[index]],
+                              *[column[index] for column in self._views[2:]])
+
+    def close(self) -> None:
+        """Отключиться от памяти в текущем процессе."""
+        for view in self._views:
+            view.release()
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """Закрыть и удалить блок памяти; вызывает владелец."""
+        self.close()
+        self.memory.unlink()
+
+
+class BloomFilter:
+    """Фильтр Блума: вероятностное множество ограниченного размера.
+
+    Размер битового массива и число хешей подбираются под capacity
+    элементов и долю ложных срабатываний error_rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        from math import ceil, log
+
+        self.size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes) -> list[int]:
+        import hashlib
+
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size
+                for index in range(self.hashes)]
+
+    def add(self, key: bytes) -> bool:
+        """Добавить ключ; вернуть True, если он, возможно, уже был."""
+        present = True
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] >> bit & 1:
+                present = False
+                self.bits[byte] |= 1 << bit
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[position // 8] >> position % 8 & 1
+                   for position in self._positions(key))
+
+    def false_positive_rate(self) -> float:
+        """Оценить долю ложных срабатываний при текущем заполнении."""
+        from math import exp
+
+        return (1 - exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class Deduplicator:
+    """Отбрасывает повторно присланные пакеты до создания `Training`.
+
+    Ключ — идентификатор пакета, если он есть, иначе содержимое пакета.
+    Последние window ключей хранятся точно; более старые повторы
+    ловит `BloomFilter` с вероятностью ложного срабатывания из `stats`.
+    """
+
+    def __init__(self, capacity: int = 1_000_000,
+                 error_rate: float = 0.001, window: int = 100_000) -> None:
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.window = window
+        self.recent: OrderedDict = OrderedDict()
+        self.seen = self.exact = self.probable = 0
+
+    @staticmethod
+    def key(workout_type: str, data: Sequence[float],
+            package_id=None) -> bytes:
+        """Получить ключ пакета по идентификатору или содержимому."""
+        if package_id is not None:
+            return f'id:{package_id}'.encode()
+        return repr((workout_type,
+                     [float(value) for value in data])).encode()
+
+    def is_duplicate(self, workout_type: str, data: Sequence[float],
+                     package_id=None) -> bool:
+        """Проверить пакет и запомнить его, если он новый."""
+        key = self.key(workout_type, data, package_id)
+        self.seen += 1
+        if key in self.recent:
+            self.recent.move_to_end(key)
+            self.exact += 1
+            return True
+        if self.bloom.add(key):
+            self.probable += 1
+            return True
+        self.recent[key] = None
+        if len(self.recent) > self.window:
+            self.recent.popitem(last=False)
+        return False
+
+    def filter(self, packages: Iterable[tuple[str, Sequence[float]]],
+               package_ids: Iterable | None = None
+               ) -> Iterator[tuple[str, Sequence[float]]]:
+        """Пропустить только новые пакеты из потока.
+
+        package_ids должны идти по одному на пакет: если их меньше или
+        больше, чем пакетов, поднимается ValueError.
+        """
+        from itertools import repeat
+
+        if package_ids is None:
+            pairs = zip(packages, repeat(None))
+        else:
+            pairs = zip(packages, package_ids, strict=True)
+        for (workout_type, data), package_id in pairs:
+            if not self.is_duplicate(workout_type, data, package_id):
+                yield workout_type, data
+
+    def stats(self) -> dict[str, float]:
+        """Получить число пакетов, повторов и оценку ложных срабатываний."""
+        return {'seen': self.seen,
+                'passed': self.seen - self.exact - self.probable,
+                'exact_duplicates': self.exact,
+                'probable_duplicates': self.probable,
+                'false_positive_rate': self.bloom.false_positive_rate()}
+
+
+def _process_shared(name: str, size: int, start: int,
+                    chunk: list[tuple[str, Sequence[float]]]) -> int:
+    results = SharedResults(size, name)
+    try:
+        return results.write(
+            start,
+            [read_package(*package).show_training_info()
+             for package in chunk],
+            [WIRE_CODES[workout_type] for workout_type, _ in chunk]
+        )
+    finally:
+        results.close()
+
+
+def process_parallel_shared(packages: Iterable[tuple[str, Sequence[float]]],
+                            workers: int | None = None,
+                            chunk_size: int = 1000,
+                            rejected: dict[int, int] | None = None
+                            ) -> SharedResults:
+    """Посчитать пакеты в пуле процессов с выдачей через общую память.
+
+    Пакеты сначала проходят `filter_packages`: некорректные
+    пропускаются и считаются в rejected, строки результата идут
+    по корректным пакетам. Тип без кода записи (`WIRE_CODES`) —
+    ValueError до запуска пула. Процессы пишут результаты прямо
+    в `SharedResults`, назад передаётся только число строк.
+    Вызывающий освобождает буфер через `unlink`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    packages = list(filter_packages(packages, rejected))
+    missing = {workout_type for workout_type, _ in packages
+               if workout_type not in WIRE_CODES}
+    if missing:
+        raise ValueError(f'Нет кода записи для типов тренировок: '
+                         f'{", ".join(sorted(missing))}')
+    results = SharedResults(len(packages))
+    try:
+        with ProcessPoolExecutor(workers or os.cpu_count() or 1) as executor:
+            futures = [
+                executor.submit(_process_shared, results.name, results.size,
+                                start, packages[start:start + chunk_size])
+                for start in range(0, len(packages), chunk_size)
+            ]
+            for future in futures:
+                future.result()
+    except BaseException:
+        results.unlink()
+        raise
+    return results
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
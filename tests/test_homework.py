@@ -450,4 +450,1258 @@ def test_main_output(input_data, expected):
         homework.main(training)
     assert get_message_output == expected, (
         'Метод `main` должен печатать результат в консоль.\n'
-    )
\ No newline at end of file
+    )
+
+
+@pytest.mark.parametrize('workout_type, rows', [
+    ('SWM', [[720, 1, 80, 25, 40], [420, 4, 20, 42, 4]]),
+    ('RUN', [[15000, 1, 75], [1206, 12, 6], [3000.33, 2.512, 75.8]]),
+    ('WLK', [[9000, 1, 75, 180], [3000.33, 2.512, 75.8, 180.1]]),
+])
+def test_calculate_batch(workout_type, rows):
+    columns = [list(column) for column in zip(*rows)]
+    result = homework.calculate_batch(workout_type, columns)
+    for index, data in enumerate(rows):
+        training = homework.read_package(workout_type, data)
+        assert result.distance[index] == training.get_distance(), (
+            'Дистанция в `calculate_batch` должна совпадать '
+            'с `get_distance`.'
+        )
+        assert result.speed[index] == training.get_mean_speed(), (
+            'Скорость в `calculate_batch` должна совпадать '
+            'с `get_mean_speed`.'
+        )
+        assert result.calories[index] == pytest.approx(
+            training.get_spent_calories()
+        ), (
+            'Калории в `calculate_batch` должны совпадать '
+            'с `get_spent_calories`.'
+        )
+
+
+def test_calculate_batch_wrong_columns():
+    with pytest.raises(ValueError):
+        homework.calculate_batch('RUN', [[15000], [1]])
+    with pytest.raises(ValueError):
+        homework.calculate_batch('XXX', [[15000], [1], [75]])
+    result = homework.calculate_batches({'RUN': [[15000], [1], [75]]})
+    assert list(result) == ['RUN'], (
+        '`calculate_batches` должна группировать результаты по типу.'
+    )
+
+
+def test_calculate_batch_numpy(monkeypatch):
+    pytest.importorskip('numpy')
+    columns = [[9000, 3000.33], [1, 2.512], [75, 75.8], [180, 180.1]]
+    calls = []
+    kernel = homework.SportsWalking.calories_kernel
+
+    def counting_kernel(*args):
+        calls.append(args)
+        return kernel(*args)
+    monkeypatch.setattr(homework.SportsWalking, 'calories_kernel',
+                        counting_kernel)
+    result = homework.calculate_batch('WLK', columns)
+    assert len(calls) == 1, (
+        'С NumPy ядро должно вызываться один раз на весь столбец.'
+    )
+    assert isinstance(result.calories, homework.array), (
+        'Результат с NumPy должен храниться в `array`.'
+    )
+    for index, data in enumerate(zip(*columns)):
+        training = homework.SportsWalking(*data)
+        assert result.calories[index] == pytest.approx(
+            training.get_spent_calories()
+        ), 'Расчёт через NumPy должен совпадать с объектами.'
+    with pytest.raises(ArithmeticError):
+        homework.calculate_batch('RUN', [[15000], [0], [75]])
+
+
+def test_calculate_batch_without_numpy(monkeypatch):
+    monkeypatch.setitem(homework.sys.modules, 'numpy', None)
+    result = homework.calculate_batch('RUN', [[15000, 1206], [1, 12],
+                                              [75, 6]])
+    assert list(result.distance) == pytest.approx([9.75, 0.7839]), (
+        'Без NumPy `calculate_batch` должна считать построчно.'
+    )
+    with pytest.raises(ArithmeticError):
+        homework.calculate_batch('RUN', [[15000], [0], [75]])
+
+
+@pytest.mark.parametrize('workout_type', sorted(homework.TRAININGS))
+def test_kernels_match_methods(workout_type):
+    training_class = homework.TRAININGS[workout_type][0]
+    packages = homework.generate_packages(50, {workout_type: 1}, seed=3)
+    for _, data in packages:
+        training = training_class(*data)
+        distance = training_class.distance_kernel(*data)
+        speed = training_class.speed_kernel(distance, *data)
+        calories = training_class.calories_kernel(speed, *data)
+        assert (distance, speed, calories) == pytest.approx((
+            training.get_distance(),
+            training.get_mean_speed(),
+            training.get_spent_calories(),
+        )), (
+            f'Формулы `*_kernel` класса {training_class.__name__} '
+            'должны совпадать с методами `get_*`.'
+        )
+
+
+def test_parse_package():
+    assert homework.parse_package('SWM 720 1 80 25 40\n') == (
+        'SWM', [720, 1, 80, 25, 40]
+    ), '`parse_package` должна возвращать код тренировки и данные.'
+
+
+def test_run_stream(tmp_path):
+    path = tmp_path / 'packages.txt'
+    path.write_text(
+        '# демо\n'
+        'SWM 720 1 80 25 40\n'
+        '\n'
+        'RUN 1206 12 6\n'
+        'WLK 9000 1 75 180\n',
+        encoding='utf-8'
+    )
+    with Capturing() as stream_output:
+        count = homework.run_stream([str(path)], chunk_size=16)
+    with Capturing() as main_output:
+        for data in (('SWM', [720, 1, 80, 25, 40]),
+                     ('RUN', [1206, 12, 6]),
+                     ('WLK', [9000, 1, 75, 180])):
+            homework.main(homework.read_package(*data))
+    assert count == 3, '`run_stream` должна вернуть число пакетов.'
+    assert stream_output == main_output, (
+        '`run_stream` должна печатать те же строки, что и `main`.'
+    )
+
+
+def test_run_stream_skips_bad_lines(tmp_path, capsys):
+    path = tmp_path / 'packages.txt'
+    path.write_text(
+        'RUN 15000 0 75\n'
+        'RUN 1 abc 75\n'
+        'RUN 15000 1 75\n'
+        'XXX 1 2 3\n'
+        'RUN 1 1\n'
+        'SWM 720 1 80 25 40\n',
+        encoding='utf-8'
+    )
+    rejected = {}
+    count = homework.run_stream([str(path)], rejected=rejected)
+    captured = capsys.readouterr()
+    assert count == 2 and len(captured.out.splitlines()) == 2, (
+        'Некорректные строки должны пропускаться, а не прерывать поток.'
+    )
+    assert rejected == {homework.OUT_OF_RANGE: 1, homework.WRONG_TYPE: 1,
+                        homework.UNKNOWN_TYPE: 1,
+                        homework.WRONG_ARITY: 1}, (
+        '`run_stream` должна считать пропущенные строки по причинам.'
+    )
+    assert 'Пропущено пакетов: 1 (Данные должны быть числами)' in (
+        captured.err
+    ), 'Пропущенные строки должны попадать в stderr.'
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_process_parallel(ordered):
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [1206, 12, 6]),
+        ('WLK', [9000, 1, 75, 180]),
+    ] * 5
+    expected = [homework.read_package(*package).show_training_info()
+                for package in packages]
+    result = list(homework.process_parallel(
+        packages, workers=2, chunk_size=2, ordered=ordered
+    ))
+    if not ordered:
+        result.sort(key=lambda info: info.get_message())
+        expected.sort(key=lambda info: info.get_message())
+    assert result == expected, (
+        '`process_parallel` должна возвращать те же `InfoMessage`, '
+        'что и последовательная обработка.'
+    )
+
+
+@pytest.mark.parametrize('input_data', [
+    ['Swimming', 1, 75, 1, 80],
+    ['Running', 2.5125, 0.0005, 1e-12, 123456789.98765],
+    ['SportsWalking', 2.512, 1.9502145, 0.7763593, 408.4294],
+])
+def test_InfoMessage_get_message_matches_format(input_data):
+    info_message = homework.InfoMessage(*input_data)
+    expected = info_message.MESSAGE.format(
+        **dict(zip(homework.InfoMessage.__slots__, input_data))
+    )
+    assert info_message.get_message() == expected, (
+        '`get_message` должен совпадать с `MESSAGE.format`.'
+    )
+
+
+def test_render_many():
+    messages = [homework.InfoMessage('Swimming', 1, 75, 1, 80),
+                homework.InfoMessage('Running', 4, 20, 4, 20)]
+    expected = ''.join(info.get_message() + '\n' for info in messages)
+    assert homework.render_many(messages).getvalue() == expected, (
+        '`render_many` должна писать сообщения построчно.'
+    )
+    output = homework.io.BytesIO()
+    homework.render_many(messages, output, chunk_size=1)
+    assert output.getvalue() == expected.encode(), (
+        '`render_many` должна писать байты UTF-8 в бинарный буфер.'
+    )
+
+
+def test_InfoMessage_slots():
+    info_message = homework.InfoMessage('Swimming', 1, 75, 1, 80)
+    assert not hasattr(info_message, '__dict__'), (
+        '`InfoMessage` должен хранить поля в `__slots__`.'
+    )
+
+
+def test_TrainingBatch():
+    rows = [[9000, 1, 75, 180], [3000.33, 2.512, 75.8, 180.1]]
+    batch = homework.TrainingBatch('WLK', rows)
+    batch.append([420, 4, 20, 42])
+    rows.append([420, 4, 20, 42])
+    assert len(batch) == 3, '`TrainingBatch` должна хранить все строки.'
+    metrics = batch.metrics()
+    for index, data in enumerate(rows):
+        training = batch[index]
+        assert isinstance(training, homework.SportsWalking), (
+            'Строка `TrainingBatch` должна быть объектом тренировки.'
+        )
+        assert training.get_data() == data, (
+            'Строка `TrainingBatch` должна хранить данные пакета.'
+        )
+        assert metrics.calories[index] == pytest.approx(
+            training.get_spent_calories()
+        ), '`TrainingBatch.metrics` должна совпадать с объектами.'
+    with pytest.raises(ValueError):
+        batch.append([1, 2, 3])
+
+
+def test_Training_cached_metrics():
+    calls = []
+
+    class CountingRunning(homework.Running):
+        @homework.cached_metric
+        def get_distance(self):
+            calls.append(1)
+            return super().get_distance()
+
+    running = CountingRunning(9000, 1, 75)
+    assert set(vars(running)) == {'action', 'duration', 'weight'}, (
+        'Тренировка должна хранить только данные пакета.'
+    )
+    info = running.show_training_info()
+    running.show_training_info()
+    assert len(calls) == 1, (
+        'Дистанция должна считаться один раз и запоминаться.'
+    )
+    assert info.calories == running.get_spent_calories(), (
+        'Калории в сообщении должны совпадать с `get_spent_calories`.'
+    )
+    running.action = 15000
+    running.weight = 80
+    assert round(running.show_training_info().calories, 3) == 850.992, (
+        'Показатели должны пересчитываться после изменения данных.'
+    )
+    assert len(calls) == 2, (
+        'После изменения данных дистанция должна пересчитаться один раз.'
+    )
+
+
+def test_Training_show_training_info_overrides(monkeypatch):
+    class FastRunning(homework.Running):
+        def get_mean_speed(self):
+            return 100
+
+    info = FastRunning(9000, 1, 75).show_training_info()
+    assert info.speed == 100, (
+        'Сообщение должно брать скорость из переопределённого '
+        '`get_mean_speed`.'
+    )
+    assert round(info.calories, 3) == 8108.055, (
+        'Калории должны считаться по переопределённому `get_mean_speed`.'
+    )
+    training = homework.Training(9000, 1, 75)
+    monkeypatch.setattr(training, 'get_spent_calories', lambda: 42)
+    info = training.show_training_info()
+    assert info.calories == 42, (
+        'Сообщение должно брать калории из `get_spent_calories`.'
+    )
+    assert 'Потрачено ккал: 42.000.' in info.get_message(), (
+        'Калории из `get_spent_calories` должны попадать в сообщение.'
+    )
+
+
+def test_binary_packages(tmp_path):
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [1206, 12, 6]),
+        ('WLK', [9000, 1, 75, 180]),
+        ('RUN', [15000, 1, 75]),
+    ]
+    buffer = homework.pack_packages(packages)
+    assert len(buffer) == homework.RECORD.size * len(packages), (
+        'Каждый пакет должен занимать одну запись фиксированной длины.'
+    )
+    path = tmp_path / 'packages.bin'
+    path.write_bytes(buffer)
+    decoded = [(workout_type, list(data)) for workout_type, data
+               in homework.iter_binary_file(str(path))]
+    assert decoded == packages, (
+        '`iter_binary_packages` должна возвращать исходные пакеты.'
+    )
+    metrics = homework.calculate_binary(buffer)
+    assert list(metrics['RUN'].distance) == [
+        homework.read_package('RUN', data).get_distance()
+        for workout_type, data in packages if workout_type == 'RUN'
+    ], '`calculate_binary` должна группировать записи по типу.'
+
+
+def test_binary_batches_single_type():
+    rows = [[9000, 1, 75], [1206, 12, 6]]
+    buffer = homework.pack_packages(('RUN', data) for data in rows)
+    columns = homework.binary_batches(buffer)['RUN']
+    assert all(isinstance(column, memoryview) for column in columns), (
+        'Столбцы одного типа должны читаться без копирования.'
+    )
+    assert [list(column) for column in columns] == [
+        list(column) for column in zip(*rows)
+    ], '`binary_batches` должна возвращать столбцы данных.'
+    with pytest.raises(ValueError):
+        homework.binary_batches(buffer[:-1])
+
+
+def test_serve_micro_batches():
+    import asyncio
+    import json
+
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [1206, 12, 6]),
+        ('WLK', [9000, 1, 75, 180]),
+    ] * 10
+
+    async def scenario():
+        started = asyncio.get_running_loop().create_future()
+        server_task = asyncio.create_task(homework.serve(
+            port=0, max_batch=8, max_delay=0.01, started=started
+        ))
+        server = await started
+        port = server.sockets[0].getsockname()[1]
+        summary = await homework.load_test(packages, port=port,
+                                           connections=6)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for line in (b'WLK 9000 1 75 180\n', b'XXX 1 2 3\n', b'STATS\n'):
+            writer.write(line)
+            responses.append((await reader.readline()).decode().rstrip())
+        writer.close()
+        server_task.cancel()
+        return summary, responses
+
+    summary, responses = asyncio.run(scenario())
+    assert summary['count'] == len(packages), (
+        '`load_test` должна дождаться ответа на каждый пакет.'
+    )
+    assert responses[0] == homework.read_package(
+        'WLK', [9000, 1, 75, 180]
+    ).show_training_info().get_message(), (
+        'Сервер должен возвращать то же сообщение, что и `main`.'
+    )
+    assert responses[1].startswith('ERROR'), (
+        'На некорректный пакет сервер должен отвечать `ERROR`.'
+    )
+    stats = json.loads(responses[2])
+    assert stats['count'] == len(packages) + 1 and stats['p99_ms'] >= 0, (
+        'Команда `STATS` должна возвращать задержки и число запросов.'
+    )
+
+
+def test_MicroBatcher_survives_failures(monkeypatch):
+    import asyncio
+
+    def broken_kernel(*args):
+        raise RuntimeError('сломанное ядро')
+
+    async def scenario():
+        batcher = homework.MicroBatcher(max_batch=4, max_delay=0.01)
+        worker = asyncio.create_task(batcher.run())
+        cancelled = asyncio.create_task(batcher.submit('RUN', [15000, 1, 75]))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        first = await asyncio.wait_for(
+            batcher.submit('RUN', [15000, 1, 75]), 1
+        )
+        monkeypatch.setattr(homework.Swimming, 'calories_kernel',
+                            classmethod(broken_kernel))
+        results = await asyncio.wait_for(asyncio.gather(
+            batcher.submit('SWM', [720, 1, 80, 25, 40]),
+            batcher.submit('WLK', [9000, 1, 75, 180]),
+            return_exceptions=True
+        ), 1)
+        monkeypatch.undo()
+        last = await asyncio.wait_for(
+            batcher.submit('SWM', [720, 1, 80, 25, 40]), 1
+        )
+        worker.cancel()
+        return first, results, last
+
+    first, results, last = asyncio.run(scenario())
+    assert first.startswith('Тип тренировки: Running'), (
+        'Отменённый запрос не должен останавливать расчёт пачек.'
+    )
+    assert isinstance(results[0], RuntimeError), (
+        'Ошибка ядра должна достаться запросам своей группы.'
+    )
+    assert results[1].startswith('Тип тренировки: SportsWalking'), (
+        'Ошибка одной группы не должна задевать другие.'
+    )
+    assert last.startswith('Тип тренировки: Swimming'), (
+        'После ошибки ядра сервер должен продолжать отвечать.'
+    )
+
+
+def test_generate_packages():
+    first = list(homework.generate_packages(50, seed=1))
+    assert first == list(homework.generate_packages(50, seed=1)), (
+        '`generate_packages` должна быть воспроизводимой при одном seed.'
+    )
+    for workout_type, data in first:
+        homework.read_package(workout_type, data).show_training_info()
+    only_running = homework.generate_packages(10, mix={'RUN': 1})
+    assert {workout_type for workout_type, _ in only_running} == {'RUN'}, (
+        '`generate_packages` должна учитывать доли типов тренировок.'
+    )
+
+
+def test_benchmark_compare():
+    from benchmarks import suite
+
+    regressions = suite.compare({'main': 1.3, 'get_message': 1.1},
+                                {'main': 1.0, 'get_message': 1.0}, 0.2)
+    assert regressions == {'main': (1.0, 1.3)}, (
+        'Регрессией считается замедление больше порога.'
+    )
+    timings = suite.run(count=20, repeat=1)
+    assert set(timings) == set(suite.cases(1)), (
+        'Замеры должны покрывать все случаи набора.'
+    )
+
+
+def test_instrumentation(tmp_path):
+    instrumentation = homework.enable_instrumentation(
+        profile_rate=1.0, profile_dir=str(tmp_path), seed=0
+    )
+    try:
+        with Capturing() as output:
+            homework.main(homework.read_package('RUN', [1206, 12, 6]))
+            homework.main(homework.read_package('SWM', [720, 1, 80, 25, 40]))
+        for package in (('WLR', [9000, 1, 75, 180]), ('RUN', [1, 2])):
+            with pytest.raises(ValueError):
+                homework.read_package(*package)
+    finally:
+        homework.disable_instrumentation()
+    assert output[0].startswith('Тип тренировки: Running'), (
+        'С включёнными метриками `main` должна печатать то же сообщение.'
+    )
+    assert instrumentation.packages == {'RUN': 1, 'SWM': 1}, (
+        'Метрики должны считать пакеты по типам тренировок.'
+    )
+    assert instrumentation.failures == {'workout_type': 1, 'arity': 1}, (
+        'Метрики должны считать ошибки проверки пакетов.'
+    )
+    assert instrumentation.stages['render'].count == 2
+    text = instrumentation.to_prometheus()
+    assert 'homework_packages_total{workout_type="RUN"} 1' in text
+    assert ('homework_stage_seconds_count{stage="read_package"} 2'
+            in text), 'Гистограммы стадий должны выгружаться в Prometheus.'
+    assert len(list(tmp_path.glob('*.pstats'))) == 2, (
+        'При profile_rate=1 каждый вызов `main` должен профилироваться.'
+    )
+    path = tmp_path / 'metrics.prom'
+    instrumentation.export(str(path))
+    assert path.read_text(encoding='utf-8') == text
+
+
+@pytest.mark.parametrize('package, expected', [
+    (('SWM', [720, 1, 80, 25, 40]), homework.VALID),
+    (('RUN', [0, 1.5, 75]), homework.VALID),
+    (('WLR', [9000, 1, 75, 180]), homework.UNKNOWN_TYPE),
+    (('RUN', [9000, 1, 75, 180]), homework.WRONG_ARITY),
+    (('RUN', [9000, '1', 75]), homework.WRONG_TYPE),
+    (('RUN', [9000, True, 75]), homework.WRONG_TYPE),
+    (('RUN', [9000, 0, 75]), homework.OUT_OF_RANGE),
+    (('WLK', [9000, 1, 75, -180]), homework.OUT_OF_RANGE),
+    (('SWM', [720, 1, 80, 25, float('nan')]), homework.OUT_OF_RANGE),
+])
+def test_PackageValidator_check(package, expected):
+    assert homework.get_validator().check(*package) == expected, (
+        'Проверка пакета должна вернуть код ошибки, а не выбросить '
+        'исключение.'
+    )
+
+
+def test_read_packages():
+    packages = [
+        ('RUN', [15000, 1, 75]),
+        ('RUN', [15000, 0, 75]),
+        ('XXX', [1]),
+        ('WLK', [9000, 1, 75, 180]),
+    ]
+    trainings, errors = homework.read_packages(packages)
+    assert list(errors) == [homework.VALID, homework.OUT_OF_RANGE,
+                            homework.UNKNOWN_TYPE, homework.VALID], (
+        '`read_packages` должна вернуть коды ошибок по каждой строке.'
+    )
+    assert [type(training).__name__ for training in trainings] == [
+        'Running', 'SportsWalking'
+    ], '`read_packages` должна пропускать некорректные пакеты.'
+
+
+def test_PackageValidator_validate_columns():
+    validator = homework.get_validator()
+    mask, errors = validator.validate_columns(
+        'RUN', [[15000, -1, 9000], [1, 1, 0], [75, 75, 75]]
+    )
+    assert list(mask) == [1, 0, 0], (
+        'Маска должна отмечать только корректные строки.'
+    )
+    assert list(errors) == [homework.VALID, homework.OUT_OF_RANGE,
+                            homework.OUT_OF_RANGE]
+    mask, errors = validator.validate_columns('RUN', [[1], [1]])
+    assert list(errors) == [homework.WRONG_ARITY]
+
+
+class Cycling(homework.Training):
+    """Тренировка: велосипед."""
+    LEN_STEP = 5.5
+    CALORIES_WEIGHT_MULTIPLIER = 0.1
+
+    @classmethod
+    def calories_kernel(cls, speed, action, duration, weight, *args):
+        return speed * cls.CALORIES_WEIGHT_MULTIPLIER * weight * duration
+
+
+def test_register_training():
+    homework.register_training('CYC', wire_code=10)(Cycling)
+    try:
+        training = homework.read_package('CYC', [3000, 1, 70])
+        assert isinstance(training, Cycling), (
+            '`read_package` должна создавать зарегистрированные классы.'
+        )
+        metrics = homework.calculate_batch('CYC', [[3000], [1], [70]])
+        assert metrics.calories[0] == training.get_spent_calories(), (
+            'Пакетный расчёт должен использовать `calories_kernel` плагина.'
+        )
+        assert homework.get_validator().check('CYC', [3000, 0, 70]) == (
+            homework.OUT_OF_RANGE
+        ), 'Проверка пакетов должна знать о новых типах тренировок.'
+        buffer = homework.pack_packages([('CYC', [3000, 1, 70])])
+        assert [workout_type for workout_type, _
+                in homework.iter_binary_packages(buffer)] == ['CYC']
+    finally:
+        homework.TRAININGS.unregister('CYC')
+    assert 'CYC' not in homework.TRAININGS
+
+
+def test_registry_lazy_entry_points(monkeypatch):
+    loaded = []
+
+    class EntryPoint:
+        name = 'CYC'
+
+        def load(self):
+            loaded.append(self.name)
+            return Cycling
+
+    registry = homework.TrainingRegistry()
+    monkeypatch.setattr(registry, '_entry_points', {'CYC': EntryPoint()})
+    assert not loaded, 'Плагины не должны импортироваться заранее.'
+    assert 'XXX' not in registry
+    assert registry['CYC'] == (Cycling, 3) and loaded == ['CYC'], (
+        'Плагин должен импортироваться при первом обращении к его коду.'
+    )
+    assert registry.get('CYC') == (Cycling, 3) and loaded == ['CYC']
+
+
+def test_RollingAggregator(tmp_path):
+    aggregator = homework.RollingAggregator()
+    monday = 1_700_438_400
+    run = homework.read_package('RUN', [15000, 1, 75])
+    swim = homework.read_package('SWM', [720, 1, 80, 25, 40])
+    wrong = homework.read_package('RUN', [1206, 12, 6])
+    aggregator.add('anna', monday + 3600, run)
+    aggregator.add('anna', monday + 2 * 86400, swim)
+    aggregator.add('anna', monday + 7200, wrong)
+    aggregator.retract('anna', monday + 7200, wrong)
+    aggregator.add('boris', monday, swim)
+    day = aggregator.get_totals('anna', 'day', monday + 60)
+    assert day['count'] == 1 and day['distance'] == run.get_distance(), (
+        'Дневные итоги должны учитывать только тренировки этого дня.'
+    )
+    week = aggregator.get_totals('anna', 'week', monday + 6 * 86400)
+    assert week['count'] == 2 and week['calories'] == pytest.approx(
+        run.get_spent_calories() + swim.get_spent_calories()
+    ), 'Недельные итоги должны суммировать тренировки недели.'
+    assert week['mean_calories'] == pytest.approx(week['calories'] / 2)
+    assert aggregator.get_totals('anna', 'week', monday - 1)['count'] == 0
+    path = tmp_path / 'aggregates.json'
+    aggregator.save(str(path))
+    restored = homework.RollingAggregator.load(str(path))
+    assert restored.totals == aggregator.totals, (
+        'Состояние должно восстанавливаться из контрольной точки.'
+    )
+
+
+def test_ResultCache(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = homework.ResultCache(maxsize=2, path=path)
+    packages = [('RUN', [15000, 1, 75]), ('SWM', [720, 1, 80, 25, 40]),
+                ('WLK', [9000, 1, 75, 180])]
+    for package in packages + [('RUN', [15000.0, 1.0, 75.0])]:
+        assert cache.get_info(*package) == homework.read_package(
+            *package
+        ).show_training_info(), (
+            'Кэш должен возвращать то же сообщение, что и расчёт.'
+        )
+    assert cache.stats() == {'hits': 0, 'disk_hits': 1, 'misses': 3,
+                             'size': 2}, (
+        'Вытесненная из памяти запись должна найтись на диске.'
+    )
+    cache.get_info('RUN', [15000, 1, 75])
+    assert cache.stats()['hits'] == 1
+    cache.close()
+
+    restored = homework.ResultCache(path=path)
+    restored.get_info('WLK', [9000, 1, 75, 180])
+    assert restored.stats()['disk_hits'] == 1, (
+        'Дисковый кэш должен переживать перезапуск.'
+    )
+    restored.close()
+
+    monkeypatch.setattr(homework.SportsWalking, 'CALORIES_WEIGHT_MULTIPLIER',
+                        0.04)
+    changed = homework.ResultCache(path=path)
+    changed.get_info('WLK', [9000, 1, 75, 180])
+    assert changed.stats()['misses'] == 1, (
+        'Изменение констант формулы должно сбрасывать кэш.'
+    )
+    changed.close()
+
+
+def test_ResultCache_disk_eviction(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = homework.ResultCache(maxsize=1, path=path, disk_maxsize=5,
+                                 commit_every=3)
+    packages = [('RUN', [15000 + index, 1, 75]) for index in range(8)]
+    for package in packages:
+        cache.get_info(*package)
+    cache.get_info(*packages[-1])
+    assert cache.disk_count == 7 and len(cache.pending) == 2, (
+        'Записи должны писаться на диск пачками по commit_every.'
+    )
+    cache.close()
+    restored = homework.ResultCache(path=path, disk_maxsize=5)
+    assert restored.disk_count == 5, (
+        'На диске должно остаться не больше disk_maxsize записей.'
+    )
+    restored.get_info(*packages[0])
+    restored.get_info(*packages[-1])
+    assert restored.stats()['misses'] == 1, (
+        'С диска должны вытесняться самые старые записи.'
+    )
+    restored.close()
+
+
+def test_ResultCache_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(homework.time, 'time', lambda: now[0])
+    cache = homework.ResultCache(ttl=10)
+    cache.get_info('RUN', [15000, 1, 75])
+    now[0] += 5
+    cache.get_info('RUN', [15000, 1, 75])
+    now[0] += 20
+    cache.get_info('RUN', [15000, 1, 75])
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2, (
+        'Записи старше ttl должны считаться промахом.'
+    )
+
+
+EXPORT_MESSAGES = [homework.InfoMessage('Swimming', 1, 0.994, 1.0, 336.0),
+                   homework.InfoMessage('Running', 12, 0.7839, 0.0653, 12.8)]
+
+
+@pytest.mark.parametrize('file_format, expected', [
+    ('csv', 'training_type,duration,distance,speed,calories\n'
+            'Swimming,1,0.994,1.0,336.0\n'
+            'Running,12,0.7839,0.0653,12.8\n'),
+    ('jsonl', '{"training_type": "Swimming", "duration": 1, '
+              '"distance": 0.994, "speed": 1.0, "calories": 336.0}\n'
+              '{"training_type": "Running", "duration": 12, '
+              '"distance": 0.7839, "speed": 0.0653, "calories": 12.8}\n'),
+    ('text', ''.join(info.get_message() + '\n' for info in EXPORT_MESSAGES)),
+])
+def test_export_messages(file_format, expected):
+    output = homework.io.StringIO()
+    count = homework.export_messages(iter(EXPORT_MESSAGES), output,
+                                     file_format, chunk_size=1)
+    assert count == 2 and output.getvalue() == expected, (
+        f'Выгрузка `{file_format}` должна содержать все поля сообщений.'
+    )
+
+
+def test_export_messages_parquet(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'messages.parquet')
+    homework.export_messages(EXPORT_MESSAGES, path, 'parquet')
+    table = parquet.read_table(path)
+    assert table.column('training_type').to_pylist() == [
+        'Swimming', 'Running'
+    ], 'Parquet должен хранить поля сообщений столбцами.'
+
+
+def test_main_many():
+    packages = [('SWM', [720, 1, 80, 25, 40]), ('RUN', [1206, 12, 6]),
+                ('WLK', [3000.33, 2.512, 75.8, 180.1])]
+    with Capturing() as expected:
+        for package in packages:
+            homework.main(homework.read_package(*package))
+    with Capturing() as output:
+        homework.main_many(homework.read_package(*package)
+                           for package in packages)
+    assert output == expected, (
+        '`main_many` должна печатать те же строки, что и `main`.'
+    )
+
+
+def test_BufferedSink(monkeypatch):
+    output = homework.io.StringIO()
+    sink = homework.BufferedSink(output, max_lines=2)
+    homework.main(homework.read_package('RUN', [1206, 12, 6]), sink)
+    assert output.getvalue() == '', 'Строки должны копиться в буфере.'
+    homework.main(homework.read_package('RUN', [15000, 1, 75]), sink)
+    assert output.getvalue().count('\n') == 2, (
+        'Буфер должен сбрасываться по числу строк.'
+    )
+    by_size = homework.BufferedSink(output, max_chars=10)
+    by_size.write_line('0123456789')
+    assert by_size.lines == [], 'Буфер должен сбрасываться по размеру.'
+    now = [0.0]
+    monkeypatch.setattr(homework.time, 'monotonic', lambda: now[0])
+    by_time = homework.BufferedSink(output, max_delay=1)
+    by_time.write_line('a')
+    now[0] = 1.5
+    by_time.write_line('b')
+    assert by_time.lines == [] and output.getvalue().endswith('a\nb\n'), (
+        'Буфер должен сбрасываться по времени.'
+    )
+
+
+def test_SessionStore(tmp_path):
+    path = str(tmp_path / 'sessions.bin')
+    packages = [('SWM', [720, 1, 80, 25, 40]), ('RUN', [1206, 12, 6]),
+                ('WLK', [9000, 1, 75, 180]), ('RUN', [15000, 1, 75])]
+    with homework.SessionStore(path) as store:
+        store.extend(packages[:2])
+        assert list(store.indices('RUN')) == [1]
+        assert store.append(*packages[2]) == 2
+        store.append(*packages[3])
+        assert list(store.indices('RUN')) == [1, 3], (
+            'Индекс типа должен обновляться при дописывании.'
+        )
+    with homework.SessionStore(path) as store:
+        assert len(store) == 4, 'Хранилище должно переживать перезапуск.'
+        assert store[-1].get_data() == [15000, 1, 75]
+        assert isinstance(store[2], homework.SportsWalking), (
+            'Сессия должна читаться по номеру без чтения предыдущих.'
+        )
+        assert [training.get_data() for training in store[1:3]] == [
+            data for _, data in packages[1:3]
+        ]
+        assert [training.get_data() for training in store[::2]] == [
+            data for _, data in packages[::2]
+        ], 'Срез хранилища должен учитывать шаг.'
+        assert [training.get_data() for training in store[::-1]] == [
+            data for _, data in packages[::-1]
+        ]
+        columns = store.columns(3, 4)['RUN']
+        assert all(isinstance(column, memoryview) for column in columns), (
+            'Столбцы одного типа должны читаться без копирования.'
+        )
+        with pytest.raises(IndexError):
+            store.package(4)
+        with pytest.raises(ValueError):
+            store.extend([('RUN', [9000, 1, 75]), ('RUN', [1, 0, 75])])
+        assert len(store) == 4, (
+            'Некорректный пакет не должен дописываться в хранилище.'
+        )
+    with open(path, 'ab') as file:
+        file.write(b'\x02' * 20)
+    with homework.SessionStore(path) as store:
+        assert len(store) == 4
+        store.append('RUN', [9000, 1, 75])
+    with homework.SessionStore(path) as store:
+        assert store.package(4) == ('RUN', (9000, 1, 75)), (
+            'Неполная запись после сбоя должна отрезаться при открытии.'
+        )
+    (tmp_path / 'broken.bin').write_bytes(b'x' * 48)
+    with pytest.raises(ValueError):
+        homework.SessionStore(str(tmp_path / 'broken.bin'))
+    (tmp_path / 'torn.bin').write_bytes(b'HWSTORE1')
+    with pytest.raises(ValueError):
+        homework.SessionStore(str(tmp_path / 'torn.bin'))
+
+
+def test_SessionIndex(tmp_path):
+    packages = list(homework.generate_packages(200, seed=3))
+    index = homework.SessionIndex()
+    with homework.SessionStore(str(tmp_path / 'sessions.bin')) as store:
+        store.extend(packages[:150])
+        assert index.sync(store) == 150
+        assert len(index.query(duration=(None, None))) == 150
+        store.extend(packages[150:])
+        assert index.sync(store) == 50, (
+            'Индекс должен дополняться только новыми сессиями.'
+        )
+    infos = [homework.read_package(*package).show_training_info()
+             for package in packages]
+
+    def brute_force(workout_type=None, duration=(None, None),
+                    calories=(None, None)):
+        return [
+            number for number, ((code, _), info)
+            in enumerate(zip(packages, infos))
+            if (workout_type is None or code == workout_type)
+            and (duration[0] is None or info.duration >= duration[0])
+            and (calories[0] is None or info.calories >= calories[0])
+            and (calories[1] is None or info.calories <= calories[1])
+        ]
+
+    queries = [
+        {'workout_type': 'SWM', 'duration': (1, None),
+         'calories': (300, None)},
+        {'calories': (100, 400)},
+        {'workout_type': 'WLK'},
+        {},
+    ]
+    for query in queries:
+        assert index.query(**query) == brute_force(**query), (
+            f'Запрос {query} должен совпадать с полным перебором.'
+        )
+    with pytest.raises(ValueError):
+        index.query(pace=(1, 2))
+
+
+def test_SessionIndex_incremental(tmp_path, monkeypatch):
+    monkeypatch.setattr(homework.SessionIndex, 'MERGE_MIN', 8)
+    monkeypatch.setattr(homework.SessionIndex, 'TAIL_FACTOR', 1)
+    packages = list(homework.generate_packages(300, seed=5))
+    index = homework.SessionIndex()
+    infos = []
+    for number, package in enumerate(packages):
+        index.add_package(number, *package)
+        infos.append(homework.read_package(*package).show_training_info())
+        if number % 37 == 0:
+            expected = [session for session, info in enumerate(infos)
+                        if 200 <= info.calories <= 600]
+            assert index.query(calories=(200, 600)) == expected, (
+                'Запросы между добавлениями должны видеть все сессии.'
+            )
+    assert len(index.tail_keys['calories']) <= 17, (
+        'Хвост должен вливаться в основной список по порогу.'
+    )
+    path = tmp_path / 'sessions.bin'
+    homework.SessionStore(str(path)).close()
+    with open(path, 'ab') as file:
+        file.write(homework.pack_packages([
+            ('RUN', [15000, 1, 75]), ('RUN', [1, 0, 75]),
+            ('SWM', [720, 1, 80, 25, 40])
+        ]))
+    with homework.SessionStore(str(path)) as store:
+        rejected = {}
+        index = homework.SessionIndex()
+        assert index.sync(store, rejected) == 2, (
+            'Некорректные записи не должны попадать в индекс.'
+        )
+        assert rejected == {homework.OUT_OF_RANGE: 1}, (
+            'Пропущенные записи должны считаться по причинам.'
+        )
+        store.extend([('WLK', [9000, 1, 75, 180])])
+        assert index.sync(store) == 1, (
+            'После некорректной записи индекс должен дополняться дальше.'
+        )
+    assert index.query(duration=(None, None)) == [0, 2, 3]
+
+
+IMPORT_BUDGET_MS = 20
+LAZY_MODULES = ('argparse', 'asyncio', 'concurrent.futures', 'cProfile',
+                'csv', 'dataclasses', 'hashlib', 'importlib.metadata',
+                'json', 'mmap', 'multiprocessing', 'random', 're',
+                'sqlite3', 'typing')
+
+
+def test_import_time(tmp_path):
+    import os
+    import subprocess
+    import sys
+    from conftest import BASE_DIR
+
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=str(tmp_path))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    runs = [subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import sys, homework; print(" ".join(sys.modules))'],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    ) for _ in range(4)]
+    loaded = set(runs[-1].stdout.split()) & set(LAZY_MODULES)
+    assert not loaded, (
+        f'Модули {sorted(loaded)} должны импортироваться лениво.'
+    )
+    total_us = min(int(line.split('|')[1])
+                   for result in runs[1:]
+                   for line in result.stderr.splitlines()
+                   if line.endswith('| homework'))
+    assert total_us / 1000 < IMPORT_BUDGET_MS, (
+        f'Импорт `homework` с готовым байт-кодом занял '
+        f'{total_us / 1000:.1f} мс, бюджет {IMPORT_BUDGET_MS} мс.'
+    )
+
+
+def test_cli(tmp_path, capsys, monkeypatch):
+    path = tmp_path / 'packages.txt'
+    path.write_text('SWM 720 1 80 25 40\nRUN 1206 12 6\n', encoding='utf-8')
+    assert homework.cli([str(path)]) == 0
+    compute_output = capsys.readouterr().out
+    assert homework.cli(['compute', str(path)]) == 0
+    assert capsys.readouterr().out == compute_output, (
+        'Вызов без подкоманды должен работать как `compute`.'
+    )
+    assert compute_output.startswith('Тип тренировки: Swimming')
+    assert homework.cli(['batch', '--format', 'csv', str(path)]) == 0
+    assert capsys.readouterr().out.splitlines()[1].startswith(
+        'Swimming,1.0,'
+    ), '`batch` должна выгружать CSV.'
+    binary = tmp_path / 'packages.bin'
+    binary.write_bytes(homework.pack_packages([('RUN', [1206, 12, 6])]))
+    assert homework.cli(['batch', '--binary', '--format', 'text',
+                         str(binary)]) == 0
+    assert capsys.readouterr().out == compute_output.splitlines(True)[1]
+    for argv in (['batch', '--binary', '--format', 'text'],
+                 ['batch', '--binary', '--format', 'text', '-']):
+        stdin = homework.io.TextIOWrapper(
+            homework.io.BytesIO(binary.read_bytes())
+        )
+        monkeypatch.setattr(homework.sys, 'stdin', stdin)
+        assert homework.cli(argv) == 0
+        assert capsys.readouterr().out == (
+            compute_output.splitlines(True)[1]
+        ), '`batch --binary` без файлов должна читать записи из stdin.'
+    binary.write_bytes(homework.RECORD.pack(9, 1, 1, 75, 0, 0))
+    assert homework.cli(['batch', '--binary', str(binary)]) == 1, (
+        'Неизвестный код записи должен давать код возврата 1.'
+    )
+    assert 'Неизвестный код тренировки' in capsys.readouterr().err
+    path.write_text('WLR 9000 1 75 180\n', encoding='utf-8')
+    assert homework.cli(['compute', str(path)]) == 1, (
+        'Некорректный пакет должен давать код возврата 1.'
+    )
+    path.write_text('SWM 720 1 80 25 40\nRUN 15000 0 75\nRUN 1206 12 6\n',
+                    encoding='utf-8')
+    capsys.readouterr()
+    assert homework.cli(['batch', '--chunk-size', '2', str(path)]) == 1, (
+        'Некорректный пакет в `batch` должен давать код возврата 1.'
+    )
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 3, (
+        '`batch` должна выгрузить все корректные пакеты.'
+    )
+    assert 'Данные вне допустимого диапазона' in captured.err
+    assert homework.cli(['batch', str(tmp_path / 'missing.txt')]) == 1
+    assert homework.cli(['bench', '--count', '100']) == 0
+
+
+def test_process_out_of_core(tmp_path, monkeypatch):
+    packages = list(homework.generate_packages(40, seed=5))
+    lines = [' '.join([code, *map(repr, data)]) for code, data in packages]
+    lines[3:3] = ['RUN 1 0 75', 'XXX 1 2 3', 'RUN a b c']
+    source = tmp_path / 'packages.txt'
+    source.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    expected = {}
+    for code, data in packages:
+        training = homework.read_package(code, data)
+        totals = expected.setdefault(code, [0, 0.0])
+        totals[0] += 1
+        totals[1] += training.get_spent_calories()
+
+    spill = homework._spill_chunk
+    calls = []
+
+    def crash_after_two(*args):
+        if len(calls) == 2:
+            raise RuntimeError('сбой')
+        calls.append(args)
+        return spill(*args)
+    monkeypatch.setattr(homework, '_spill_chunk', crash_after_two)
+    workdir = str(tmp_path / 'work')
+    with pytest.raises(RuntimeError):
+        homework.process_out_of_core(str(source), workdir, chunk_rows=10)
+    monkeypatch.setattr(homework, '_spill_chunk', spill)
+    result = homework.process_out_of_core(str(source), workdir,
+                                          chunk_rows=10)
+    assert len(result['spills']) == 5 and result['invalid'] == 3, (
+        'После сбоя обработка должна продолжиться с последнего блока.'
+    )
+    for code, (count, calories) in expected.items():
+        assert result['totals'][code]['count'] == count
+        assert result['totals'][code]['calories'] == pytest.approx(calories)
+    rows = sum(len(open(path, encoding='utf-8').readlines()) - 1
+               for path in result['spills'])
+    assert rows == len(packages), (
+        'Результаты каждого пакета должны попасть в файлы блоков.'
+    )
+    small = str(tmp_path / 'small')
+    assert len(homework.process_out_of_core(str(source), small,
+                                            chunk_rows=1)['spills']) == 43
+    sizes = [homework.os.path.getsize(f'{directory}/manifest.json')
+             for directory in (workdir, small)]
+    assert sizes[1] - sizes[0] < 16, (
+        'Размер манифеста не должен расти с числом блоков.'
+    )
+
+
+def test_calculate_curve():
+    actions = [2 + index % 3 for index in range(3600)]
+    curve = homework.calculate_curve('RUN', actions, 75, window=10)
+    running = homework.Running(sum(actions), 1, 75)
+    assert len(curve.time) == 3600 and curve.time[-1] == pytest.approx(1)
+    assert curve.distance[-1] == pytest.approx(running.get_distance()), (
+        'Накопленная дистанция должна совпадать с итогом тренировки.'
+    )
+    assert curve.calories[-1] == pytest.approx(
+        running.get_spent_calories()
+    ), 'Накопленные калории бега должны совпадать с итогом тренировки.'
+    assert curve.speed[-1] == pytest.approx(
+        (curve.distance[-1] - curve.distance[-11]) / (10 / 3600)
+    ), 'Скорость должна сглаживаться скользящим средним.'
+    pools = [1 if index % 60 == 0 else 0 for index in range(3600)]
+    swim = homework.calculate_curve('SWM', actions, 80, 25, pools)
+    assert swim.calories[-1] == pytest.approx(
+        homework.Swimming(sum(actions), 1, 80, 25, sum(pools))
+        .get_spent_calories()
+    ), 'Накопленные калории плавания должны совпадать с итогом.'
+    walk = homework.calculate_curve('WLK', [3] * 120, 75, 180).downsample(60)
+    assert list(walk.time) == pytest.approx([1 / 60, 2 / 60]), (
+        '`downsample` должна оставлять каждую factor-ю точку.'
+    )
+    assert walk.speed[0] == pytest.approx(3 * 0.65 / 1000 * 3600)
+    with pytest.raises(ValueError):
+        homework.calculate_curve('WLK', actions, 75)
+
+
+def test_process_parallel_shared():
+    packages = list(homework.generate_packages(25, seed=7))
+    results = homework.process_parallel_shared(packages, workers=2,
+                                               chunk_size=4)
+    try:
+        expected = [homework.read_package(*package).show_training_info()
+                    for package in packages]
+        assert list(results.messages()) == expected, (
+            'Сообщения из общей памяти должны совпадать с расчётом.'
+        )
+        assert list(results.columns['calories']) == [
+            info.calories for info in expected
+        ], 'Столбцы должны читаться из общей памяти напрямую.'
+        assert list(results.messages(24)) == expected[24:]
+    finally:
+        results.unlink()
+    rejected = {}
+    results = homework.process_parallel_shared(
+        [('RUN', [1, 0, 75]), *packages[:3], ('XXX', [1, 2, 3])],
+        workers=2, chunk_size=2, rejected=rejected
+    )
+    try:
+        assert list(results.messages()) == expected[:3], (
+            'Некорректные пакеты должны пропускаться до расчёта.'
+        )
+        assert sum(rejected.values()) == 2, (
+            'Пропущенные пакеты должны считаться по причинам.'
+        )
+    finally:
+        results.unlink()
+
+
+def test_process_parallel_shared_without_wire_code():
+    @homework.register_training('CYC')
+    class Cycling(homework.Running):
+        pass
+
+    try:
+        with pytest.raises(ValueError, match='CYC'):
+            homework.process_parallel_shared([('CYC', [1000, 1, 70])])
+    finally:
+        homework.TRAININGS.unregister('CYC')
+
+
+def test_BloomFilter():
+    bloom = homework.BloomFilter(1000, error_rate=0.01)
+    keys = [str(index).encode() for index in range(1000)]
+    assert sum(bloom.add(key) for key in keys) < 30
+    assert all(key in bloom for key in keys), (
+        'Фильтр Блума не должен терять добавленные ключи.'
+    )
+    false_positives = sum(str(index).encode() in bloom
+                          for index in range(1000, 11000))
+    assert false_positives / 10000 < 0.03, (
+        'Доля ложных срабатываний должна быть близка к заданной.'
+    )
+    assert bloom.false_positive_rate() == pytest.approx(0.01, rel=0.5)
+
+
+def test_Deduplicator():
+    packages = [('RUN', [15000, 1, 75]), ('SWM', [720, 1, 80, 25, 40]),
+                ('RUN', [15000.0, 1.0, 75.0]), ('WLK', [9000, 1, 75, 180])]
+    deduplicator = homework.Deduplicator(capacity=100, window=2)
+    assert list(deduplicator.filter(packages + packages[1:2])) == [
+        packages[0], packages[1], packages[3]
+    ], 'Повторы пакетов должны отбрасываться до расчёта.'
+    stats = deduplicator.stats()
+    assert stats['exact_duplicates'] == 1 and stats['passed'] == 3, (
+        'Повтор в окне должен считаться точным.'
+    )
+    assert stats['probable_duplicates'] == 1, (
+        'Повтор вне окна должен ловиться фильтром Блума.'
+    )
+    assert 0 <= stats['false_positive_rate'] < 0.001
+    by_id = homework.Deduplicator(capacity=100)
+    assert len(list(by_id.filter(packages, package_ids=[1, 2, 3, 1]))) == 3, (
+        'С идентификаторами повтором считается пакет с тем же id.'
+    )
+    with pytest.raises(ValueError):
+        list(homework.Deduplicator(capacity=100).filter(
+            packages, package_ids=[1, 2]
+        ))
+
+
+@pytest.mark.parametrize('precision, tolerance', [
+    ('float32', 1e-6),
+    ('decimal', 1e-12),
+])
+def test_precision_modes(precision, tolerance):
+    for workout_type in ('SWM', 'RUN', 'WLK'):
+        packages = list(homework.generate_packages(
+            20, mix={workout_type: 1}, seed=11
+        ))
+        columns = [list(column) for column in zip(*[
+            data for _, data in packages
+        ])]
+        batch = homework.calculate_batch(workout_type, columns, precision)
+        for index, package in enumerate(packages):
+            training = homework.read_package(*package)
+            converted = homework.convert_training(training, precision)
+            assert type(converted).__name__ == type(training).__name__
+            expected = training.get_spent_calories()
+            calories = converted.get_spent_calories()
+            assert abs(float(calories) - expected) <= tolerance * expected, (
+                f'Режим `{precision}` должен укладываться в заявленную '
+                'погрешность.'
+            )
+            assert batch.calories[index] == calories, (
+                'Пакетный и поштучный расчёт должны совпадать в одном '
+                'режиме точности.'
+            )
+
+
+def test_precision_storage():
+    from decimal import Decimal
+
+    columns = [[15000, 9000], [1, 2], [75, 80]]
+    assert homework.calculate_batch(
+        'RUN', columns, 'float32'
+    ).calories.typecode == 'f', 'Режим float32 должен хранить float32.'
+    info = homework.convert_training(
+        homework.read_package('RUN', [15000, 1, 75]), 'decimal'
+    ).show_training_info()
+    assert info.calories == Decimal('797.805'), (
+        'Режим decimal должен давать точный десятичный результат.'
+    )
+    info.distance = Decimal('0.0005')
+    expected = info.MESSAGE.format(
+        training_type=info.training_type, duration=info.duration,
+        distance=info.distance, speed=info.speed, calories=info.calories
+    )
+    assert 'Дистанция: 0.000 км' in expected
+    assert info.get_message() == expected, (
+        'Значения `Decimal` должны выводиться без перевода во float.'
+    )
+    assert homework.render_many([info]).getvalue() == expected + '\n'
+    with pytest.raises(ValueError):
+        homework.precision_class(homework.Running, 'float16')
+
+
+def test_generate_packages_distributions():
+    packages = list(homework.generate_packages(
+        2000, seed=2, invalid_rate=0.1,
+        distributions={'weight': ('uniform', 60, 61)}
+    ))
+    _, errors = homework.read_packages(packages)
+    invalid = sum(1 for error in errors if error)
+    assert 120 < invalid < 280, (
+        'Доля некорректных пакетов должна соответствовать invalid_rate.'
+    )
+    valid = [data for code, data in packages if code != 'XXX']
+    assert all(60 <= data[2] <= 61 for data in valid), (
+        'distributions должны переопределять распределение поля.'
+    )
+    durations = [data[1] for data in valid if data[1]]
+    assert 0.9 < sum(durations) / len(durations) < 1.1, (
+        'По умолчанию длительность распределена около часа.'
+    )
+
+
+@pytest.mark.parametrize('file_format', ['text', 'binary'])
+def test_write_packages(tmp_path, file_format):
+    path = str(tmp_path / 'packages')
+
+    def read_back():
+        if file_format == 'binary':
+            packages = homework.iter_binary_file(path)
+        else:
+            packages = homework.stream_packages(homework.read_lines([path]))
+        return [(code, list(data)) for code, data in packages]
+
+    written = homework.write_packages(path, 25, file_format, block=10,
+                                      seed=4)
+    assert written == (tmp_path / 'packages').stat().st_size
+    expected = [*homework.generate_packages(10, seed=4),
+                *homework.generate_packages(10, seed=5),
+                *homework.generate_packages(5, seed=6)]
+    assert read_back() == expected, (
+        'Каждый блок должен генерироваться заново со своим seed.'
+    )
+    homework.write_packages(path, 25, file_format, block=10, repeat=True,
+                            seed=4)
+    packages = read_back()
+    assert len(packages) == 25, '`write_packages` должна записать count.'
+    assert packages == expected[:10] * 2 + expected[:5], (
+        'С repeat=True блок пакетов должен повторяться.'
+    )
+    generated = list(homework.generate_packages(200, seed=7,
+                                                invalid_rate=0.5))
+    homework.write_packages(path, 200, file_format, seed=7,
+                            invalid_rate=0.5)
+    if file_format == 'binary':
+        generated = [(code, data) for code, data in generated
+                     if code in homework.WIRE_CODES
+                     and len(data) == homework.TRAININGS[code][1]]
+    assert read_back() == generated, (
+        'Испорченные пакеты, которые формат не хранит, не должны '
+        'записываться как корректные.'
+    )
+    rejected = {}
+    list(homework.filter_packages(generated, rejected))
+    assert rejected, 'Часть записанных пакетов должна быть испорчена.'